@@ -0,0 +1,239 @@
+# ============================================
+# AFFINITY財務模擬：多情境彙總圖（百分位扇形圖、損益平衡分布、熱圖）
+# ============================================
+#
+# plot_scenario 每個情境輸出六張圖，情境一多便無法閱讀也無法負擔。
+# 此模組把任意數量的情境分批送入批次引擎，只累積固定大小的統計量：
+#   - 每期現金水位與 MAU 的分箱直方圖（montecarlo.StreamingPercentiles）→ 百分位扇形圖
+#   - 損益平衡月份的次數分布
+#   - 兩個參數的二維分箱內的平均損益平衡月份 → 熱圖
+# 圖表規格只含這些統計量（長期間再降採樣至 MAX_POINTS 點），繪圖時間與情境數無關。
+#   python aggregate.py --grid 60                  # 訂閱率 × RPM 的 60×60 格點
+#   python aggregate.py --grid 60 --months 120
+
+import argparse
+
+import numpy as np
+
+from engine import PARAM_INDEX, as_horizon, chunk_rows, simulate_batch
+from instrument import traced
+from montecarlo import StreamingPercentiles
+from render import figure_spec, op, render_figures
+
+# 扇形圖的分箱數（每期）
+FAN_BINS = 1024
+FAN_PERCENTILES = (5, 25, 50, 75, 95)
+# 每條曲線最多繪製的點數
+MAX_POINTS = 400
+# 熱圖每軸的最多分箱數；取值數不超過此數時每個取值一格
+MAX_HEAT_BINS = 64
+# 高亮標註之間至少相隔「總月數 / MAX_HIGHLIGHT_LABELS」個月，避免文字重疊
+MAX_HIGHLIGHT_LABELS = 8
+
+# ============================================
+# 統計量累積
+# ============================================
+
+def _heat_edges(values):
+    # 取值數少時每個取值一格（邊界取中點），否則等寬分箱
+    unique = np.unique(values)
+    if len(unique) == 1:
+        return np.array([unique[0] - 0.5, unique[0] + 0.5])
+    if len(unique) <= MAX_HEAT_BINS:
+        middle = (unique[1:] + unique[:-1]) / 2
+        return np.concatenate([[2 * unique[0] - middle[0]], middle, [2 * unique[-1] - middle[-1]]])
+    return np.linspace(unique[0], unique[-1], MAX_HEAT_BINS + 1)
+
+class ScenarioAggregate:
+    # 分批累積多情境的統計量；記憶體與情境數無關
+
+    def __init__(self, horizon, heatmap=None, x_edges=None, y_edges=None, bins=FAN_BINS):
+        # heatmap: (x 參數, y 參數) 或 None
+        self.horizon = as_horizon(horizon)
+        periods = self.horizon.periods
+        self.count = 0
+        self.cash_balance = StreamingPercentiles(periods, bins)
+        self.mau = StreamingPercentiles(periods, bins)
+        # 索引 0 為未達損益平衡，其餘為第 n 期達成的情境數
+        self.breakeven_histogram = np.zeros(periods + 1, dtype=np.int64)
+        self.heatmap = heatmap
+        if heatmap:
+            self.x_edges, self.y_edges = np.asarray(x_edges), np.asarray(y_edges)
+            shape = (len(self.y_edges) - 1, len(self.x_edges) - 1)
+            self.heat_total = np.zeros(shape, dtype=np.int64)
+            self.heat_reached = np.zeros(shape, dtype=np.int64)
+            self.heat_month_sum = np.zeros(shape)
+
+    def update(self, params, results):
+        self.count += len(params)
+        self.cash_balance.update(results['cash_balance'])
+        self.mau.update(results['mau'])
+        breakeven = results['breakeven_month']
+        self.breakeven_histogram += np.bincount(breakeven, minlength=len(self.breakeven_histogram))
+        if self.heatmap:
+            x_name, y_name = self.heatmap
+            ix = np.clip(np.searchsorted(self.x_edges, params[:, PARAM_INDEX[x_name]], side='right') - 1, 0, len(self.x_edges) - 2)
+            iy = np.clip(np.searchsorted(self.y_edges, params[:, PARAM_INDEX[y_name]], side='right') - 1, 0, len(self.y_edges) - 2)
+            cell = (iy * (len(self.x_edges) - 1) + ix).astype(np.int64)
+            size = self.heat_total.size
+            reached = breakeven > 0
+            months = self.horizon.period_to_month(np.maximum(breakeven, 1))
+            self.heat_total += np.bincount(cell, minlength=size).reshape(self.heat_total.shape)
+            self.heat_reached += np.bincount(cell[reached], minlength=size).reshape(self.heat_total.shape)
+            self.heat_month_sum += np.bincount(cell[reached], weights=months[reached], minlength=size).reshape(self.heat_total.shape)
+
+    def breakeven_by_month(self):
+        # (月份 1..M 的達成情境數, 未達成情境數)
+        months = int(np.ceil(self.horizon.months))
+        by_month = np.bincount(
+            self.horizon.period_to_month(np.arange(1, self.horizon.periods + 1)),
+            weights=self.breakeven_histogram[1:], minlength=months + 1,
+        )[1:months + 1]
+        return by_month.astype(np.int64), int(self.breakeven_histogram[0])
+
+    def heat_mean_breakeven(self):
+        # 各格的平均損益平衡月份（只計達成者）；整格皆未達成者為 nan
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.heat_reached > 0, self.heat_month_sum / self.heat_reached, np.nan)
+
+@traced('aggregate.collect')
+def aggregate_params(params, horizon, heatmap=None, chunk_size=None, revenue_model=None):
+    # params: (N, P) 參數陣列；分批模擬並累積統計量
+    # chunk_size: 每批情境數的上限（選擇性）；實際批次大小另依期數由 engine.chunk_rows() 限制
+    params = np.atleast_2d(params)
+    x_edges = y_edges = None
+    if heatmap:
+        x_edges = _heat_edges(params[:, PARAM_INDEX[heatmap[0]]])
+        y_edges = _heat_edges(params[:, PARAM_INDEX[heatmap[1]]])
+    aggregate = ScenarioAggregate(horizon, heatmap, x_edges, y_edges)
+    rows = chunk_rows(aggregate.horizon, limit=chunk_size)
+    for start in range(0, len(params), rows):
+        chunk = params[start:start + rows]
+        aggregate.update(chunk, simulate_batch(chunk, aggregate.horizon, revenue_model))
+    return aggregate
+
+# ============================================
+# 圖表規格
+# ============================================
+
+def _downsample(length, max_points=MAX_POINTS):
+    # 等距取樣的索引，保留最後一點
+    if length <= max_points:
+        return np.arange(length)
+    return np.unique(np.append(np.linspace(0, length - 1, max_points).round().astype(int), length - 1))
+
+def readable_highlights(highlight_months, months_total, max_labels=MAX_HIGHLIGHT_LABELS):
+    # 只保留期間內、且彼此相隔夠遠的高亮月份
+    gap = months_total / max_labels
+    kept = []
+    for month in sorted(highlight_months):
+        if 1 <= month <= months_total and (not kept or month - kept[-1] >= gap):
+            kept.append(month)
+    return kept
+
+def fan_chart_spec(filename, title, ylabel, bands, horizon, highlight_months=(), color='#009688'):
+    # bands: {百分位: (periods,) 陣列}；外層為最寬的百分位帶，中位數以實線表示
+    horizon = as_horizon(horizon)
+    index = _downsample(horizon.periods)
+    x = (index + 1) / horizon.periods_per_month
+    qs = sorted(bands)
+    ops = []
+    for i in range(len(qs) // 2):
+        low, high = qs[i], qs[-1 - i]
+        ops.append(op('fill_between', x, bands[low][index], bands[high][index],
+                      color=color, alpha=0.15 + 0.15 * i, linewidth=0, label=f'P{low}–P{high}'))
+    if len(qs) % 2:
+        median = bands[qs[len(qs) // 2]]
+        ops.append(op('plot', x, median[index], color=color, linewidth=2, label=f'P{qs[len(qs) // 2]}'))
+        months_total = int(horizon.months)
+        highlights = readable_highlights(highlight_months, months_total)
+        if highlights:
+            # annotate_highlight_points 以月份索引取值，傳入每月月底的中位數
+            month_end = np.minimum(np.round(np.arange(1, months_total + 1) * horizon.periods_per_month).astype(int), horizon.periods) - 1
+            ops.append(op('annotate_highlight_points', list(range(1, months_total + 1)), median[month_end], highlights, color=color))
+    ops += [
+        op('set_title', title, fontweight='bold'),
+        op('set_xlabel', 'Months'),
+        op('set_ylabel', ylabel),
+        op('grid', linestyle='--', alpha=0.7),
+        op('legend', loc='upper left'),
+    ]
+    return figure_spec(filename, ops)
+
+def breakeven_histogram_spec(filename, aggregate):
+    by_month, never = aggregate.breakeven_by_month()
+    months = list(range(1, len(by_month) + 1))
+    share = never / aggregate.count if aggregate.count else 0
+    return figure_spec(filename, [
+        op('bar', months, by_month, color='#4CAF50', alpha=0.8, label='Scenarios reaching breakeven'),
+        op('set_title', f'Breakeven Month Distribution ({aggregate.count:,} scenarios)', fontweight='bold'),
+        op('set_xlabel', 'Breakeven Month'),
+        op('set_ylabel', 'Scenarios'),
+        op('grid', linestyle='--', alpha=0.7),
+        op('legend', loc='upper left'),
+        op('figure_text', 0.9, 0.9, f'No breakeven: {never:,} ({share:.1%})', ha='right', va='top', color='red', fontsize=11),
+    ])
+
+def breakeven_heatmap_spec(filename, aggregate):
+    x_name, y_name = aggregate.heatmap
+    x_edges, y_edges = aggregate.x_edges, aggregate.y_edges
+    return figure_spec(filename, [
+        op('imshow', aggregate.heat_mean_breakeven(), origin='lower', aspect='auto', cmap='viridis_r',
+           extent=[x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]], interpolation='nearest'),
+        op('colorbar', label='Mean breakeven month (blank: never)'),
+        op('set_title', f'Breakeven Month by {x_name} × {y_name}', fontweight='bold'),
+        op('set_xlabel', x_name),
+        op('set_ylabel', y_name),
+    ])
+
+def aggregate_specs(aggregate, prefix='aggregate', highlight_months=()):
+    bands_cash = aggregate.cash_balance.percentiles(FAN_PERCENTILES)
+    bands_mau = aggregate.mau.percentiles(FAN_PERCENTILES)
+    specs = [
+        fan_chart_spec(f"{prefix}_cash_balance_fan.png", f'Cash Balance Percentiles ({aggregate.count:,} scenarios)',
+                       'Cash Balance (TWD)', bands_cash, aggregate.horizon, highlight_months),
+        fan_chart_spec(f"{prefix}_mau_fan.png", f'MAU Percentiles ({aggregate.count:,} scenarios)',
+                       'MAU', bands_mau, aggregate.horizon, highlight_months, color='#1E88E5'),
+        breakeven_histogram_spec(f"{prefix}_breakeven_histogram.png", aggregate),
+    ]
+    if aggregate.heatmap:
+        specs.append(breakeven_heatmap_spec(f"{prefix}_breakeven_heatmap.png", aggregate))
+    return specs
+
+def plot_aggregate(params, horizon, heatmap=None, prefix='aggregate', highlight_months=(), output_dir=None, workers=None, force=False):
+    aggregate = aggregate_params(params, horizon, heatmap)
+    render_figures(aggregate_specs(aggregate, prefix, highlight_months), output_dir=output_dir, workers=workers, force=force)
+    return aggregate
+
+# ============================================
+# 主程式
+# ============================================
+
+def main(argv=None):
+    from engine import pack_params
+    from model import HIGHLIGHT_MONTHS, MONTHS_TOTAL, scenario_params
+    from solver import grid_params
+
+    parser = argparse.ArgumentParser(description="AFFINITY 多情境彙總圖")
+    parser.add_argument('--grid', type=int, default=60, help="訂閱率與 RPM 各取幾個值")
+    parser.add_argument('--months', type=int, default=MONTHS_TOTAL)
+    parser.add_argument('--output-dir', help="輸出目錄（預設 ~/Downloads/tmp）")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--force', action='store_true')
+    args = parser.parse_args(argv)
+
+    columns = grid_params(
+        scenario_params(),
+        subscription_rate=np.linspace(0.01, 0.03, args.grid),
+        rpm=np.linspace(40, 90, args.grid),
+    )
+    aggregate = plot_aggregate(
+        pack_params(**columns), args.months, heatmap=('subscription_rate', 'rpm'),
+        highlight_months=HIGHLIGHT_MONTHS, output_dir=args.output_dir, workers=args.workers, force=args.force,
+    )
+    by_month, never = aggregate.breakeven_by_month()
+    reached = by_month.sum()
+    print(f"情境數: {aggregate.count:,}，達成損益平衡: {reached:,}，未達成: {never:,}")
+
+if __name__ == "__main__":
+    main()
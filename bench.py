@@ -0,0 +1,324 @@
+# ============================================
+# AFFINITY財務模擬：效能基準測試
+# ============================================
+#
+# 量測模型各階段（成長率、MAU、收入、現金流、指標）、表格格式化與圖表輸出，
+# 涵蓋情境數 1 → 10^6 與期數 36 → 3650 的矩陣，回報吞吐量、tracemalloc 峰值記憶體與各階段耗時。
+#   python bench.py --save bench.json
+#   python bench.py --compare bench.json --threshold 0.25  # 與基準比較，退步時以錯誤碼結束
+# 每個案例重複量測多次，以最佳值比較；門檻另依兩次執行各自的量測離散程度放寬。
+# 疑似退步的案例會重新量測（最多 CONFIRM_ROUNDS 輪）並合併樣本，短暫的系統負載不會造成誤報。
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from engine import (
+    PARAM_NAMES, Horizon, batch_cash_flow, batch_growth_rates, batch_mau, batch_metrics, batch_revenues, chunk_rows, pack_params,
+    unpack_params,
+)
+from instrument import span
+from model import scenario_params
+
+DEFAULT_SCENARIOS = (1, 100, 10_000, 1_000_000)
+DEFAULT_PERIODS = (36, 156, 1095, 3650)
+QUICK_SCENARIOS = (1, 100, 10_000)
+QUICK_PERIODS = (36, 1095)
+# 整個案例的格數上限，超過者略過（避免預設執行時間過長）
+MAX_CASE_CELLS = 4 * 10 ** 9
+# 每個案例的計時次數；超過 LARGE_CASE_CELLS 格的大型案例最多 LARGE_CASE_REPEAT 次
+DEFAULT_REPEAT = 5
+LARGE_CASE_CELLS = 10 ** 7
+LARGE_CASE_REPEAT = 3
+# --compare 時疑似退步案例的重新量測輪數
+CONFIRM_ROUNDS = 2
+# 退步門檻：同一份程式連續兩次執行的最佳值相差可達 10–20%，低於此值的門檻會誤報
+DEFAULT_THRESHOLD = 0.25
+
+# ============================================
+# 工具
+# ============================================
+
+def horizon_for(periods):
+    # 期數對應的步長：短期以月、中期以週、長期以日
+    if periods <= 120:
+        return Horizon(periods=periods)
+    if periods <= 520:
+        return Horizon(periods=periods, step='week')
+    return Horizon(periods=periods, step='day')
+
+def random_params(n, seed=0):
+    # 在基準情境（model.DEFAULT_SCENARIO）上下 20% 內隨機取值
+    rng = np.random.default_rng(seed)
+    columns = {name: value * rng.uniform(0.8, 1.2, n) for name, value in scenario_params().items()}
+    return pack_params(**columns)
+
+def _measure(func, repeat):
+    # 回傳 (各次秒數, tracemalloc 峰值位元組, 最快那次的回傳值)
+    # tracemalloc 會拖慢 Python 層的配置，計時與記憶體分開量測：計時 repeat 次，另以一次執行量測記憶體
+    samples = []
+    best = float('inf')
+    result = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - started
+        samples.append(elapsed)
+        if elapsed < best:
+            best, result = elapsed, value
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return samples, peak, result
+
+def _timing(samples, peak, stages):
+    # 最佳值用於比較與吞吐量；中位數與全部樣本供判斷量測雜訊
+    return {
+        'seconds': min(samples),
+        'median_seconds': float(np.median(samples)),
+        'samples': samples,
+        'peak_bytes': peak,
+        'stages': stages,
+    }
+
+# ============================================
+# 各項量測
+# ============================================
+
+def bench_kernels(n, periods, repeat):
+    horizon = horizon_for(periods)
+    chunk = chunk_rows(horizon)
+    params = random_params(min(n, chunk))
+
+    def run():
+        stages = dict.fromkeys(('growth', 'mau', 'revenue', 'cash_flow', 'metrics'), 0.0)
+        done = 0
+        while done < n:
+            rows = min(chunk, n - done)
+            p = unpack_params(params[:rows])
+            t0 = time.perf_counter()
+            growth = batch_growth_rates(horizon, p['initial_growth_rate'], p['final_growth_rate'])
+            t1 = time.perf_counter()
+            mau = batch_mau(growth, horizon)
+            t2 = time.perf_counter()
+            sub, ad, revenue = batch_revenues(mau, p['subscription_rate'], p['monthly_subscription_price'], p['annual_subscription_price'], p['rpm'], horizon)
+            t3 = time.perf_counter()
+            cash_flow, cumulative = batch_cash_flow(revenue, p['personnel_cost_low'], p['personnel_cost_high'], p['operational_cost'], horizon)
+            t4 = time.perf_counter()
+            batch_metrics({
+                'cash_flow': cash_flow,
+                'cumulative_surplus': cumulative,
+                'cash_balance': p['initial_capital'][:, None] + cumulative,
+            })
+            t5 = time.perf_counter()
+            for stage, seconds in zip(stages, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)):
+                stages[stage] += seconds
+            done += rows
+        return stages
+
+    return _timing(*_measure(run, repeat))
+
+def bench_formatting(n, periods, repeat):
+    # process_scenario 的表格字串格式化（ScenarioResult.formatted_rows）
+    from engine import simulate_batch
+    from results import results_from_batch
+
+    results = results_from_batch([f"s{i}" for i in range(n)], simulate_batch(random_params(n), horizon_for(periods)))
+
+    def run():
+        return sum(1 for result in results for _ in result.formatted_rows())
+
+    samples, peak, _ = _measure(run, repeat)
+    return _timing(samples, peak, {'formatting': min(samples)})
+
+def bench_rendering(n, periods, repeat):
+    # plot_scenario 的六張圖（單一行程、略過快取），輸出至暫存目錄
+    import main
+    from model import HIGHLIGHT_MONTHS
+    from render import render_figures
+
+    rows = random_params(n)
+    with tempfile.TemporaryDirectory() as output_dir:
+        def run():
+            # 規格建立與繪製在同一次執行中分別計時
+            started = time.perf_counter()
+            with span('bench.specs', scenarios=len(rows)):
+                jobs = []
+                for i, row in enumerate(rows):
+                    params = dict(zip(PARAM_NAMES, row))
+                    main.plot_scenario(f"bench{i}", periods, highlight_months=HIGHLIGHT_MONTHS, jobs=jobs, **params)
+            specs_done = time.perf_counter()
+            with span('bench.render', figures=len(jobs)), open(os.devnull, 'w') as devnull:
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    render_figures(jobs, output_dir=output_dir, workers=1, force=True)
+                finally:
+                    sys.stdout = stdout
+            return {'specs': specs_done - started, 'render': time.perf_counter() - specs_done}
+
+        return _timing(*_measure(run, repeat))
+
+BENCHMARKS = {
+    'kernels': bench_kernels,
+    'formatting': bench_formatting,
+    'rendering': bench_rendering,
+}
+
+def build_cases(scenarios, periods):
+    cases = []
+    for p in periods:
+        for n in scenarios:
+            cases.append(('kernels', n, p))
+    # 格式化與繪圖成本與情境數成正比，只取較小的規模
+    for n in scenarios:
+        if n <= 1_000:
+            cases.append(('formatting', n, 36))
+    cases.append(('rendering', 1, 36))
+    return cases
+
+def run_benchmarks(cases, repeat, max_case_cells=MAX_CASE_CELLS):
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'cases': [],
+    }
+    for name, n, periods in cases:
+        if n * periods > max_case_cells:
+            print(f"{name:<10} N={n:>9,} T={periods:>5}  略過（超過 {max_case_cells:,} 格）")
+            continue
+        result = run_case(name, n, periods, repeat)
+        report['cases'].append(result)
+        _print_case(result)
+    return report
+
+def run_case(name, n, periods, repeat):
+    # 大型案例減少重複次數，但仍需多次才能估計雜訊
+    result = BENCHMARKS[name](n, periods, repeat if n * periods <= LARGE_CASE_CELLS else min(repeat, LARGE_CASE_REPEAT))
+    result.update(name=name, scenarios=n, periods=periods, throughput=n * periods / result['seconds'])
+    return result
+
+def _print_case(result):
+    print(
+        f"{result['name']:<10} N={result['scenarios']:>9,} T={result['periods']:>5}  {result['seconds'] * 1000:>10.2f} ms "
+        f"(中位數 +{_spread(result):>5.1%})  "
+        f"{result['throughput']:>14,.0f} 格/秒  峰值 {result['peak_bytes'] / 2 ** 20:>8.1f} MiB"
+    )
+
+# ============================================
+# 與基準比較
+# ============================================
+
+def _case_key(case):
+    return (case['name'], case['scenarios'], case['periods'])
+
+# 差距小於此絕對值者視為量測雜訊（秒、位元組）
+NOISE_FLOOR = {'seconds': 0.005, 'peak_bytes': 2 ** 20}
+
+def _spread(case):
+    # 計時的相對離散程度：中位數高於最佳值的比例（舊格式的基準沒有樣本，視為 0）
+    if 'median_seconds' not in case:
+        return 0.0
+    return case['median_seconds'] / case['seconds'] - 1
+
+def compare(report, baseline, threshold):
+    # 回傳退步清單：耗時或峰值記憶體超過基準 (1 + 門檻) 倍
+    # 耗時以各自最佳值比較，門檻再加上兩次執行的相對離散程度，雜訊大的案例需要更大的差距才算退步
+    previous = {_case_key(case): case for case in baseline['cases']}
+    regressions = []
+    for case in report['cases']:
+        old = previous.get(_case_key(case))
+        if old is None:
+            continue
+        for field, floor in NOISE_FLOOR.items():
+            margin = threshold + (_spread(old) + _spread(case) if field == 'seconds' else 0)
+            if case[field] > old[field] * (1 + margin) and case[field] - old[field] > floor:
+                regressions.append((_case_key(case), field, old[field], case[field]))
+    return regressions
+
+def _merge_rerun(case, rerun):
+    # 合併重新量測的樣本：最佳值、中位數與峰值記憶體皆以全部樣本重算
+    if rerun['seconds'] < case['seconds']:
+        case['stages'] = rerun['stages']
+    case['samples'] = case['samples'] + rerun['samples']
+    case['seconds'] = min(case['samples'])
+    case['median_seconds'] = float(np.median(case['samples']))
+    case['peak_bytes'] = min(case['peak_bytes'], rerun['peak_bytes'])
+    case['throughput'] = case['scenarios'] * case['periods'] / case['seconds']
+
+def confirm_regressions(report, baseline, threshold, repeat, rounds=CONFIRM_ROUNDS):
+    # 疑似退步的案例重新量測並合併樣本後再比較；每一輪都仍退步者才回報
+    regressions = compare(report, baseline, threshold)
+    for round_number in range(rounds):
+        if not regressions:
+            break
+        suspects = {key for key, *_ in regressions}
+        print(f"\n重新量測 {len(suspects)} 個疑似退步的案例（第 {round_number + 1} / {rounds} 輪）:")
+        for case in report['cases']:
+            if _case_key(case) in suspects:
+                _merge_rerun(case, run_case(case['name'], case['scenarios'], case['periods'], repeat))
+                _print_case(case)
+        regressions = compare(report, baseline, threshold)
+    return regressions
+
+# ============================================
+# 主程式
+# ============================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AFFINITY 效能基準測試")
+    parser.add_argument('--quick', action='store_true', help="只跑較小的矩陣")
+    parser.add_argument('--scenarios', help="以逗號分隔的情境數，例如 1,1000,1000000")
+    parser.add_argument('--periods', help="以逗號分隔的期數，例如 36,3650")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="每個案例的計時次數（取最佳；大型案例最多 3 次）")
+    parser.add_argument('--max-case-cells', type=float, default=MAX_CASE_CELLS, help="單一案例的情境×期數上限")
+    parser.add_argument('--save', help="結果 JSON 輸出路徑")
+    parser.add_argument('--compare', help="基準 JSON 路徑")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="判定退步的相對門檻（另加上量測離散程度）")
+    parser.add_argument('--confirm-rounds', type=int, default=CONFIRM_ROUNDS, help="疑似退步案例的重新量測輪數")
+    args = parser.parse_args(argv)
+
+    scenarios = QUICK_SCENARIOS if args.quick else DEFAULT_SCENARIOS
+    periods = QUICK_PERIODS if args.quick else DEFAULT_PERIODS
+    if args.scenarios:
+        scenarios = tuple(int(float(v)) for v in args.scenarios.split(','))
+    if args.periods:
+        periods = tuple(int(v) for v in args.periods.split(','))
+
+    print("\n==================== 效能基準 ====================")
+    report = run_benchmarks(build_cases(scenarios, periods), args.repeat, int(args.max_case_cells))
+
+    status = 0
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = confirm_regressions(report, baseline, args.threshold, args.repeat, args.confirm_rounds)
+        if regressions:
+            status = 1
+            print(f"\n發現 {len(regressions)} 項退步（門檻 {args.threshold:.0%}）:")
+            for (name, n, p), field, old, new in regressions:
+                print(f"  {name} N={n:,} T={p}  {field}: {old:,.4g} → {new:,.4g} ({new / old - 1:+.1%})")
+        else:
+            print(f"\n與基準相比無退步（門檻 {args.threshold:.0%}）")
+
+    # 重新量測的樣本一併寫出
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"結果已儲存至: {args.save}")
+    print("================================================")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+# ============================================
+# AFFINITY財務模擬：命令列工具
+# ============================================
+#
+#   python cli.py summary              只計算並輸出財務摘要（不載入 matplotlib / tabulate）
+#   python cli.py table                輸出逐月表格（table.py）
+#   python cli.py plot                 輸出所有圖表（main.py）
+#   python cli.py sweep --param rpm --values 40:90:11
+#   python cli.py --trace trace.json plot   各階段計時（Chrome trace JSON + 結束時的文字摘要）
+#   python cli.py --scenarios my.toml table 改用其他情境檔（同環境變數 AFFINITY_SCENARIOS）
+#
+# 繪圖與表格函式庫只在對應子命令中才匯入，排程與 CI 常用的 summary 可在毫秒級完成。
+
+import argparse
+import sys
+import time
+
+# summary 路徑不得載入的重量級模組
+HEAVY_MODULES = ('matplotlib', 'tabulate')
+
+def _scenario_params(name):
+    from model import scenario_params
+    return scenario_params(name)
+
+def _months(args):
+    from model import MONTHS_TOTAL
+    return args.months or MONTHS_TOTAL
+
+# ============================================
+# 子命令
+# ============================================
+
+def cmd_summary(args):
+    started = time.perf_counter()
+    from model import SCENARIOS, simulate_scenario
+    from results import print_summary
+
+    summaries = []
+    for scenario in SCENARIOS.values():
+        result = simulate_scenario(scenario['name'], _months(args), **scenario['params'])
+        summaries.append((scenario['name'], result.breakeven_month, result.final_cumulative_surplus))
+    print_summary(summaries)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if args.import_budget_ms is not None:
+        # 匯入時間預算檢查：供 CI 守住 summary 路徑的啟動速度
+        loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+        if loaded:
+            print(f"summary 路徑載入了重量級模組: {', '.join(loaded)}", file=sys.stderr)
+            return 1
+        if elapsed_ms > args.import_budget_ms:
+            print(f"summary 耗時 {elapsed_ms:.1f} ms，超過預算 {args.import_budget_ms:.1f} ms", file=sys.stderr)
+            return 1
+        print(f"summary 耗時 {elapsed_ms:.1f} ms（預算 {args.import_budget_ms:.1f} ms）", file=sys.stderr)
+    return 0
+
+def cmd_table(args):
+    import table
+    try:
+        table.main(output=args.output, fmt=args.format)
+    except ValueError as e:  # 不支援的格式或缺少 pyarrow
+        print(e, file=sys.stderr)
+        return 2
+    return 0
+
+def cmd_plot(args):
+    import main
+    main.plot_and_save_individual_figs(output_dir=args.output_dir, workers=args.workers, force=args.force)
+    return 0
+
+def cmd_sweep(args):
+    import numpy as np
+    from engine import PARAM_NAMES, pack_params, summarize_batch
+    from model import DEFAULT_SCENARIO, SCENARIOS
+    from sweep import parse_values
+
+    if args.param not in PARAM_NAMES:
+        print(f"未知參數: {args.param}（可用: {', '.join(PARAM_NAMES)}）", file=sys.stderr)
+        return 2
+    args.scenario = args.scenario or DEFAULT_SCENARIO
+    if args.scenario not in SCENARIOS:
+        print(f"未知情境: {args.scenario}（可用: {', '.join(SCENARIOS)}）", file=sys.stderr)
+        return 2
+    values = np.array(parse_values(args.values))
+    params = dict(_scenario_params(args.scenario))
+    params[args.param] = values
+    revenue_model = None
+    if args.revenue_model == 'cohort':
+        from cohort import cohort_revenue_model
+        revenue_model = cohort_revenue_model()
+    if args.export:
+        # 逐月序列串流匯出，情境名稱為掃描值
+        from export import batches_from_params, export
+        batches = batches_from_params(pack_params(**params), _months(args), names=values, revenue_model=revenue_model)
+        try:
+            rows = export(batches, args.export, args.format)
+        except ValueError as e:  # 不支援的格式或缺少 pyarrow
+            print(e, file=sys.stderr)
+            return 2
+        # 匯出至標準輸出時，訊息改寫至 stderr 以免混入資料
+        print(f"已匯出 {rows:,} 列至: {args.export}", file=sys.stderr if args.export == '-' else sys.stdout)
+        return 0
+    metrics = summarize_batch(pack_params(**params), _months(args), revenue_model)
+
+    print(f"\n{SCENARIOS[args.scenario]['name']} Scenario，掃描 {args.param}")
+    print(f"{args.param:>28}  {'損益平衡月份':>8}  {'最終累積餘額 (TWD)':>18}  {'最低現金水位 (TWD)':>18}")
+    for i, value in enumerate(values):
+        breakeven = metrics['breakeven_month'][i]
+        print(
+            f"{value:>28,.6g}  {breakeven if breakeven else '未達成':>12}  "
+            f"{int(metrics['final_cumulative_surplus'][i]):>24,}  {int(metrics['min_cash_balance'][i]):>24,}"
+        )
+    return 0
+
+# ============================================
+# 主程式
+# ============================================
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="AFFINITY 財務模擬")
+    parser.add_argument('--trace', help="啟用效能量測並將 Chrome trace JSON 寫至此路徑（同環境變數 AFFINITY_TRACE）")
+    parser.add_argument('--scenarios', help="情境檔（.toml / .json；預設 scenarios.toml，同環境變數 AFFINITY_SCENARIOS）")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    summary = sub.add_parser('summary', help="只計算並輸出財務摘要")
+    summary.add_argument('--months', type=int, help="模擬月數（預設 MONTHS_TOTAL）")
+    summary.add_argument('--import-budget-ms', type=float, help="超過此耗時或載入繪圖/表格模組時以錯誤碼結束")
+    summary.set_defaults(func=cmd_summary)
+
+    table = sub.add_parser('table', help="輸出逐月表格")
+    table.add_argument('--output', help="改為匯出數值結果至此檔案（.csv / .jsonl / .parquet）")
+    table.add_argument('--format', choices=('csv', 'jsonl', 'parquet'), help="匯出格式（預設依副檔名）")
+    table.set_defaults(func=cmd_table)
+
+    plot = sub.add_parser('plot', help="輸出所有圖表")
+    plot.add_argument('--output-dir', help="輸出目錄（預設 ~/Downloads/tmp）")
+    plot.add_argument('--workers', type=int, help="平行繪圖的行程數")
+    plot.add_argument('--force', action='store_true', help="忽略快取，全部重新繪製")
+    plot.set_defaults(func=cmd_plot)
+
+    sweep = sub.add_parser('sweep', help="掃描單一參數")
+    sweep.add_argument('--param', required=True)
+    sweep.add_argument('--values', required=True, help="start:stop:count 或以逗號分隔的數值")
+    sweep.add_argument('--scenario', help="情境檔中的情境鍵（預設為基準情境：baseline，或檔案中的第一個情境）")
+    sweep.add_argument('--months', type=int, help="模擬月數（預設 MONTHS_TOTAL）")
+    sweep.add_argument('--revenue-model', choices=('flat', 'cohort'), default='flat', help="收入模型：固定訂閱率或訂閱世代（cohort.py）")
+    sweep.add_argument('--export', help="改為串流匯出逐月序列至此檔案（.csv / .jsonl / .parquet；- 為標準輸出）")
+    sweep.add_argument('--format', choices=('csv', 'jsonl', 'parquet'), help="匯出格式（預設依副檔名）")
+    sweep.set_defaults(func=cmd_sweep)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.scenarios:
+        # 需在子命令匯入 model 之前設定，model 於匯入時載入情境檔
+        import os
+        os.environ['AFFINITY_SCENARIOS'] = args.scenarios
+    if args.trace:
+        # 需在子命令匯入模型與繪圖模組之前啟用，@traced 才會包裝各階段
+        import instrument
+        instrument.enable(args.trace)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
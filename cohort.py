@@ -0,0 +1,159 @@
+# ============================================
+# AFFINITY財務模擬：訂閱世代(cohort)與流失模型
+# ============================================
+#
+# 原本的收入模型假設每期 MAU 皆以固定訂閱率付費，且每位訂閱者同時支付月費與年費/12。
+# 此模組改以「取得世代」追蹤訂閱者：
+#   - 每期新增用戶 × 訂閱率 = 該期新訂閱世代；
+#   - 世代依方案拆成月繳與年繳（annual_plan_share）；
+#   - 月繳方案每月以 monthly_churn_rate 流失（或依自訂留存曲線），每期支付月費；
+#   - 年繳方案於加入時與每個週年支付年費，週年時以 annual_renewal_rate 續約，否則流失。
+# 期 t 的收入 = Σ_c 新訂閱[c] × 核心[t - c]，即新訂閱序列與每位訂閱者收入核心的因果卷積。
+# 世代×期數矩陣只在小規模時直接展開，長期間（如多年日步長）改用 FFT 卷積，
+# 整批情境一次計算，不對世代做 Python 迴圈。
+
+import numpy as np
+
+from engine import _column, as_horizon
+from instrument import traced
+
+# 世代假設預設值
+COHORT_DEFAULTS = {
+    'annual_plan_share': 0.3,     # 新訂閱者選擇年繳方案的比例
+    'monthly_churn_rate': 0.08,   # 月繳方案每月流失率
+    'annual_renewal_rate': 0.6,   # 年繳方案到期續約率
+}
+# 世代×期數矩陣（情境數 × 期數²）的格數上限，超過時改用 FFT 卷積
+DENSE_MAX_CELLS = 4 * 10 ** 6
+
+# ============================================
+# 新訂閱與留存核心
+# ============================================
+
+def batch_new_subscribers(mau, subscription_rate):
+    # 每期新增用戶（MAU 增量，不為負）中付費訂閱的人數
+    new_users = np.diff(mau, axis=1, prepend=0).clip(min=0)
+    return new_users * _column(subscription_rate)
+
+def retention_kernels(horizon, monthly_churn_rate, annual_renewal_rate, retention_curve=None):
+    # 回傳三個 (N 或 1, T) 核心，索引為訂閱後經過的期數：
+    #   monthly_survival  月繳訂閱者仍在訂閱的比例
+    #   annual_survival   年繳訂閱者仍在訂閱的比例
+    #   annual_payment    年繳訂閱者在該期支付年費的比例（加入當期與每個週年）
+    # retention_curve: 自訂月繳留存曲線（依訂閱月齡，第 0 個月為 1.0），
+    #   曲線之後以 monthly_churn_rate 繼續衰減
+    horizon = as_horizon(horizon)
+    age_months = np.arange(horizon.periods) / horizon.periods_per_month
+    monthly_survival = (1 - _column(monthly_churn_rate)) ** age_months
+    if retention_curve is not None:
+        curve = np.asarray(retention_curve, dtype=float)
+        last = len(curve) - 1
+        tail = curve[-1] * (1 - _column(monthly_churn_rate)) ** np.clip(age_months - last, 0, None)
+        monthly_survival = np.where(age_months <= last, np.interp(age_months, np.arange(len(curve)), curve), tail)
+
+    terms = np.floor(age_months / 12)
+    annual_survival = _column(annual_renewal_rate) ** terms
+    renewal_due = np.diff(terms, prepend=-1) > 0
+    return monthly_survival, annual_survival, annual_survival * renewal_due
+
+# ============================================
+# 批次卷積
+# ============================================
+
+def cohort_matrix(new_subscribers, kernel):
+    # 世代×期數矩陣：[n, c, t] = 第 c 期世代在第 t 期的值（t < c 為 0）
+    periods = new_subscribers.shape[1]
+    age = np.arange(periods)[None, :] - np.arange(periods)[:, None]
+    return new_subscribers[:, :, None] * np.where(age >= 0, kernel[:, age.clip(min=0)], 0)
+
+@traced('cohort.convolve')
+def batch_convolve(new_subscribers, kernel):
+    # 每列的因果卷積 Σ_c new_subscribers[c] × kernel[t - c]，截斷至 T 期
+    rows = max(new_subscribers.shape[0], kernel.shape[0])
+    periods = new_subscribers.shape[1]
+    if rows * periods * periods <= DENSE_MAX_CELLS:
+        return cohort_matrix(new_subscribers, kernel).sum(axis=1)
+    size = 1 << (2 * periods - 1).bit_length()
+    spectrum = np.fft.rfft(new_subscribers, size, axis=1) * np.fft.rfft(kernel, size, axis=1)
+    # FFT 的捨入誤差可能產生極小的負值
+    return np.fft.irfft(spectrum, size, axis=1)[:, :periods].clip(min=0)
+
+# ============================================
+# 收入模型
+# ============================================
+
+@traced('cohort.revenue')
+def batch_cohort_revenues(
+    mau, subscription_rate, monthly_subscription_price, annual_subscription_price, rpm, horizon=None,
+    annual_plan_share=COHORT_DEFAULTS['annual_plan_share'],
+    monthly_churn_rate=COHORT_DEFAULTS['monthly_churn_rate'],
+    annual_renewal_rate=COHORT_DEFAULTS['annual_renewal_rate'],
+    retention_curve=None,
+):
+    # 回傳 {subscription_revenue, ad_revenue, monthly_revenue, active_subscribers}，皆為 (N, T) 每期數值
+    # 訂閱收入採現金基礎：月繳每期收月費（依步長換算），年繳於加入與續約當期一次收年費
+    horizon = as_horizon(mau.shape[1] if horizon is None else horizon)
+    new_subscribers = batch_new_subscribers(mau, subscription_rate)
+    monthly_survival, annual_survival, annual_payment = retention_kernels(
+        horizon, monthly_churn_rate, annual_renewal_rate, retention_curve
+    )
+    annual_share = _column(annual_plan_share)
+    revenue_kernel = (
+        (1 - annual_share) * monthly_survival * horizon.per_period(_column(monthly_subscription_price))
+        + annual_share * annual_payment * _column(annual_subscription_price)
+    )
+    active_kernel = (1 - annual_share) * monthly_survival + annual_share * annual_survival
+
+    subscription_revenue = batch_convolve(new_subscribers, revenue_kernel)
+    active_subscribers = batch_convolve(new_subscribers, active_kernel)
+    # 未訂閱（含已流失）的用戶貢獻廣告收入
+    ad_revenue = horizon.per_period((mau - active_subscribers).clip(min=0) * _column(rpm) / 1000)
+    return {
+        'subscription_revenue': subscription_revenue,
+        'ad_revenue': ad_revenue,
+        'monthly_revenue': subscription_revenue + ad_revenue,
+        'active_subscribers': active_subscribers,
+    }
+
+def cohort_revenue_model(**assumptions):
+    # 供 engine.simulate_batch(revenue_model=...) 使用；assumptions 可為純量或每情境一維陣列
+    unknown = set(assumptions) - set(COHORT_DEFAULTS) - {'retention_curve'}
+    if unknown:
+        raise ValueError(f"未知世代假設: {', '.join(sorted(unknown))}")
+    options = {**COHORT_DEFAULTS, **assumptions}
+
+    def revenue_model(mau, p, horizon):
+        return batch_cohort_revenues(
+            mau, p['subscription_rate'], p['monthly_subscription_price'], p['annual_subscription_price'], p['rpm'],
+            horizon, **options,
+        )
+    return revenue_model
+
+# ============================================
+# 主程式：與原本的固定訂閱率模型比較
+# ============================================
+
+def main():
+    from engine import batch_metrics, simulate_batch
+    from model import MONTHS_TOTAL, scenario_batch
+
+    names, params = scenario_batch()
+    legacy = batch_metrics(simulate_batch(params, MONTHS_TOTAL))
+    results = simulate_batch(params, MONTHS_TOTAL, cohort_revenue_model())
+    metrics = batch_metrics(results)
+
+    print("\n==================== 世代模型摘要 ====================")
+    print("假設: " + "，".join(f"{name}={value}" for name, value in COHORT_DEFAULTS.items()))
+    for i, name in enumerate(names):
+        print(f"{name} Scenario:")
+        for label, m in (("固定訂閱率", legacy), ("世代模型", metrics)):
+            breakeven = m['breakeven_month'][i]
+            print(
+                f"  {label}: 損益平衡 {f'第 {breakeven} 月' if breakeven else '未達成'}，"
+                f"最終累積餘額 {int(m['final_cumulative_surplus'][i]):,} TWD"
+            )
+        print(f"  期末訂閱人數: {int(results['active_subscribers'][i, -1]):,}")
+    print("================================================")
+
+if __name__ == "__main__":
+    main()
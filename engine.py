@@ -0,0 +1,270 @@
+# ============================================
+# AFFINITY財務模擬：NumPy 批次情境引擎
+# ============================================
+#
+# 一次計算 N 組情境 × T 期的 MAU、收入、現金流與現金水位。
+# 參數以 (N, 參數數量) 的陣列傳入，欄位順序見 PARAM_NAMES；
+# 期數與每期長度（月/週/日）由 Horizon 描述，傳入整數則視為月數。
+
+import numpy as np
+
+from instrument import traced
+
+# 參數欄位順序（批次參數陣列的每一欄）
+PARAM_NAMES = (
+    'initial_growth_rate',
+    'final_growth_rate',
+    'monthly_subscription_price',
+    'annual_subscription_price',
+    'subscription_rate',
+    'rpm',
+    'personnel_cost_low',
+    'personnel_cost_high',
+    'operational_cost',
+    'initial_capital',
+)
+PARAM_INDEX = {name: i for i, name in enumerate(PARAM_NAMES)}
+
+# 前兩個月 MAU 與收入為 0，第三個月(month=2)以 1000 人為基礎開始成長
+RAMP_MONTHS = 2
+STARTING_MAU = 1000
+
+# 分批計算時單批的情境×期數格數上限（每個 float64 序列約 32 MB），見 chunk_rows()
+CHUNK_CELLS = 4 * 10 ** 6
+
+# 每種步長在一個月內的期數
+PERIODS_PER_MONTH = {
+    'month': 1.0,
+    'week': 52 / 12,
+    'day': 365 / 12,
+}
+
+# ============================================
+# 模擬期間
+# ============================================
+
+class Horizon:
+    # 模擬期間：步長、總期數與前期無營收的期數
+    # 所有假設因子皆為「每月」數值，由 Horizon 換算成每期數值
+
+    __slots__ = ('step', 'periods', 'periods_per_month', 'ramp_periods')
+
+    def __init__(self, periods=None, step='month', years=None, ramp_months=RAMP_MONTHS):
+        if step not in PERIODS_PER_MONTH:
+            raise ValueError(f"不支援的步長: {step}")
+        if (periods is None) == (years is None):
+            raise ValueError("periods 與 years 需擇一指定")
+        self.step = step
+        self.periods_per_month = PERIODS_PER_MONTH[step]
+        if periods is None:
+            periods = int(round(years * 12 * self.periods_per_month))
+        self.periods = int(periods)
+        self.ramp_periods = int(round(ramp_months * self.periods_per_month))
+        if self.periods < self.ramp_periods + 2:
+            raise ValueError(f"期數 {self.periods} 過短，至少需 {self.ramp_periods + 2} 期")
+
+    def __repr__(self):
+        return f"Horizon(periods={self.periods}, step={self.step!r})"
+
+    # 可作為快取鍵
+    def _key(self):
+        return (self.step, self.periods, self.ramp_periods)
+
+    def __eq__(self, other):
+        return isinstance(other, Horizon) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    @property
+    def months(self):
+        return self.periods / self.periods_per_month
+
+    def growth_rate_per_period(self, monthly_rate):
+        # 月成長率換算成等效的每期複利成長率
+        return (1 + monthly_rate) ** (1 / self.periods_per_month) - 1
+
+    def per_period(self, monthly_amount):
+        # 每月金額（收入、成本）換算成每期金額
+        return monthly_amount / self.periods_per_month
+
+    def period_to_month(self, period):
+        # 第 period 期（從 1 起算）落在第幾個月（從 1 起算）
+        return np.ceil(np.asarray(period) / self.periods_per_month).astype(int)
+
+def as_horizon(horizon):
+    # 整數視為月數，維持原本 months_total 的介面
+    if isinstance(horizon, Horizon):
+        return horizon
+    return Horizon(periods=horizon)
+
+def chunk_rows(horizon, cells=CHUNK_CELLS, limit=None):
+    # 每批情境數：不超過 cells 個情境×期數格（至少 1 列），記憶體與期數無關；limit 為呼叫端的上限
+    rows = max(1, cells // as_horizon(horizon).periods)
+    return min(rows, limit) if limit else rows
+
+# ============================================
+# 參數陣列工具
+# ============================================
+
+def pack_params(**columns):
+    # 將各參數（純量或一維陣列）廣播成 (N, len(PARAM_NAMES)) 的參數陣列
+    missing = [name for name in PARAM_NAMES if name not in columns]
+    if missing:
+        raise ValueError(f"缺少參數: {', '.join(missing)}")
+    unknown = [name for name in columns if name not in PARAM_INDEX]
+    if unknown:
+        raise ValueError(f"未知參數: {', '.join(unknown)}")
+    arrays = np.broadcast_arrays(*[np.atleast_1d(np.asarray(columns[name], dtype=float)) for name in PARAM_NAMES])
+    return np.stack(arrays, axis=1)
+
+def unpack_params(params):
+    # 將 (N, P) 參數陣列拆回 {參數名稱: (N,) 陣列}
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    if params.shape[1] != len(PARAM_NAMES):
+        raise ValueError(f"參數陣列需有 {len(PARAM_NAMES)} 欄，收到 {params.shape[1]} 欄")
+    return {name: params[:, i] for i, name in enumerate(PARAM_NAMES)}
+
+def _column(values):
+    # 純量或 (N,) 陣列轉為 (N, 1)，方便與 (N, T) 陣列廣播
+    return np.asarray(values, dtype=float).reshape(-1, 1)
+
+# ============================================
+# 各階段批次計算
+# ============================================
+
+@traced('engine.growth')
+def batch_growth_rates(horizon, initial_growth_rate, final_growth_rate):
+    # 凸性指數型下降：第一個成長期為 initial，最後一期為 final（皆為月成長率）
+    horizon = as_horizon(horizon)
+    initial = _column(initial_growth_rate)
+    final = _column(final_growth_rate)
+    periods = np.arange(horizon.ramp_periods, horizon.periods)
+    ratio = (periods - horizon.ramp_periods) / (horizon.periods - 1 - horizon.ramp_periods)
+    growth = np.zeros((initial.shape[0], horizon.periods))
+    growth[:, horizon.ramp_periods:] = initial * (final / initial) ** (ratio ** 2)
+    return growth
+
+@traced('engine.mau')
+def batch_mau(growth_rates, horizon=None):
+    # MAU 以每期成長率的累積乘積計算
+    horizon = as_horizon(growth_rates.shape[1] if horizon is None else horizon)
+    ramp = horizon.ramp_periods
+    mau = np.zeros_like(growth_rates)
+    mau[:, ramp:] = STARTING_MAU * np.cumprod(1 + horizon.growth_rate_per_period(growth_rates[:, ramp:]), axis=1)
+    return mau
+
+@traced('engine.revenue')
+def batch_revenues(mau, subscription_rate, monthly_subscription_price, annual_subscription_price, rpm, horizon=None):
+    horizon = as_horizon(mau.shape[1] if horizon is None else horizon)
+    subscription_rate = _column(subscription_rate)
+    price = _column(monthly_subscription_price) + _column(annual_subscription_price) / 12
+    subscription_revenue = horizon.per_period(mau * subscription_rate * price)
+    ad_revenue = horizon.per_period(mau * (1 - subscription_rate) * _column(rpm) / 1000)
+    subscription_revenue[:, :horizon.ramp_periods] = 0
+    ad_revenue[:, :horizon.ramp_periods] = 0
+    return subscription_revenue, ad_revenue, subscription_revenue + ad_revenue
+
+@traced('engine.cash_flow')
+def batch_cash_flow(monthly_revenue, personnel_cost_low, personnel_cost_high, operational_cost, horizon=None):
+    # 累積餘額以前綴和計算，成本與期數呈線性
+    horizon = as_horizon(monthly_revenue.shape[1] if horizon is None else horizon)
+    in_ramp = np.arange(horizon.periods) < horizon.ramp_periods
+    personnel_costs = np.where(in_ramp, _column(personnel_cost_low), _column(personnel_cost_high))
+    cash_flow = monthly_revenue - horizon.per_period(personnel_costs + _column(operational_cost))
+    cumulative_surplus = np.cumsum(cash_flow, axis=1)
+    return cash_flow, cumulative_surplus
+
+def _first_true(mask):
+    # 每列第一個 True 的期數（從 1 起算）；整列皆 False 者為 0
+    return np.where(mask.any(axis=1), mask.argmax(axis=1) + 1, 0)
+
+def batch_breakeven_month(cumulative_surplus):
+    # 第一個累積餘額 >= 0 的期數（從 1 起算；月步長即為月份）；未達成者為 0
+    return _first_true(cumulative_surplus >= 0)
+
+# ============================================
+# 批次指標
+# ============================================
+
+@traced('engine.metrics')
+def batch_metrics(results):
+    # results: simulate_batch 的輸出；所有指標皆以整批陣列運算，不逐一情境迴圈
+    # 月份類指標在非月步長時為期數（從 1 起算），0 代表未發生
+    cash_flow = results['cash_flow']
+    cumulative_surplus = results['cumulative_surplus']
+    cash_balance = results['cash_balance']
+    periods = cash_balance.shape[1]
+    rows = np.arange(cash_balance.shape[0])
+
+    cash_out_month = _first_true(cash_balance < 0)
+    min_cash_month = cash_balance.argmin(axis=1) + 1
+    final_balance = cash_balance[:, -1]
+    final_cash_flow = cash_flow[:, -1]
+
+    # 跑道：期間內資金用盡者為用盡前的月數；
+    # 未用盡但最後一期仍在燒錢者，以最後一期的燒錢速度外推；已轉正者為無限
+    with np.errstate(divide='ignore', invalid='ignore'):
+        extrapolated = periods + final_balance / -final_cash_flow
+    runway_months = np.where(
+        cash_out_month > 0,
+        cash_out_month - 1,
+        np.where(final_cash_flow < 0, extrapolated, np.inf),
+    )
+
+    return {
+        'breakeven_month': batch_breakeven_month(cumulative_surplus),
+        'cash_out_month': cash_out_month,
+        'min_cash_balance': cash_balance[rows, min_cash_month - 1],
+        'min_cash_month': min_cash_month,
+        'runway_months': runway_months,
+        'final_cumulative_surplus': cumulative_surplus[:, -1],
+    }
+
+# ============================================
+# 批次主流程
+# ============================================
+
+@traced('engine.simulate_batch')
+def simulate_batch(params, horizon, revenue_model=None):
+    # params: (N, len(PARAM_NAMES)) 陣列；horizon: 月數或 Horizon
+    # revenue_model: 可替換的收入模型 (mau, 參數欄位 dict, horizon) -> dict，
+    #   至少包含 subscription_revenue / ad_revenue / monthly_revenue，其餘鍵一併併入結果；
+    #   None 為原本的固定訂閱率模型（batch_revenues），例如 cohort.cohort_revenue_model()
+    # 回傳各項 (N, horizon.periods) 陣列（收入與現金流為每期金額）
+    horizon = as_horizon(horizon)
+    p = unpack_params(params)
+    growth_rates = batch_growth_rates(horizon, p['initial_growth_rate'], p['final_growth_rate'])
+    mau = batch_mau(growth_rates, horizon)
+    if revenue_model is None:
+        subscription_revenue, ad_revenue, monthly_revenue = batch_revenues(
+            mau, p['subscription_rate'], p['monthly_subscription_price'], p['annual_subscription_price'], p['rpm'], horizon
+        )
+        revenues = {
+            'subscription_revenue': subscription_revenue,
+            'ad_revenue': ad_revenue,
+            'monthly_revenue': monthly_revenue,
+        }
+    else:
+        revenues = revenue_model(mau, p, horizon)
+    cash_flow, cumulative_surplus = batch_cash_flow(
+        revenues['monthly_revenue'], p['personnel_cost_low'], p['personnel_cost_high'], p['operational_cost'], horizon
+    )
+    return {
+        'growth_rates': growth_rates,
+        'mau': mau,
+        **revenues,
+        'cash_flow': cash_flow,
+        'cumulative_surplus': cumulative_surplus,
+        'cash_balance': _column(p['initial_capital']) + cumulative_surplus,
+        'breakeven_month': batch_breakeven_month(cumulative_surplus),
+    }
+
+def summarize_batch(params, horizon, revenue_model=None):
+    # 只需要摘要指標時使用（例如參數掃描），不保留各期序列
+    return batch_metrics(simulate_batch(params, horizon, revenue_model))
+
+def breakeven_or_none(breakeven_month):
+    # 批次結果中的 0 轉回單一情境介面使用的 None
+    month = int(breakeven_month)
+    return month if month > 0 else None
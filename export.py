@@ -0,0 +1,176 @@
+# ============================================
+# AFFINITY財務模擬：串流匯出（CSV / JSONL / Parquet）
+# ============================================
+#
+# 以「情境 × 月份」的長表格式匯出逐月結果，數值欄位維持數值（不轉成 "1,234 TWD" 字串），
+# 供其他工具讀取。整條流程為產生器管線：
+#   來源（ScenarioResult、simulate_batch 輸出或分批模擬的參數陣列）
+#   → 每批最多 batch_rows 列的欄式批次 → 寫出器整批寫入
+# 記憶體用量只與單批大小有關，與情境總數無關。Parquet 需要 pyarrow（僅在使用時匯入）。
+
+import csv
+import json
+import os
+import sys
+
+import numpy as np
+
+from engine import as_horizon, chunk_rows, simulate_batch
+from instrument import span
+from results import SERIES_COLUMNS
+
+COLUMNS = ('scenario', 'month') + SERIES_COLUMNS
+DEFAULT_BATCH_ROWS = 2 ** 16
+# 分批模擬時單批的情境×期數格數上限：長表轉換會複製每個序列，比 engine.CHUNK_CELLS 更小（約 80 MB 的模擬輸出）
+EXPORT_CHUNK_CELLS = 2 ** 20
+FORMATS = ('csv', 'jsonl', 'parquet')
+
+# ============================================
+# 來源：產生欄式批次 {欄位: 一維陣列}
+# ============================================
+
+def batches_from_batch(names, results, batch_rows=DEFAULT_BATCH_ROWS):
+    # simulate_batch 的 (N, T) 輸出 → 長表批次（以整個情境為單位切批）
+    periods = results['mau'].shape[1]
+    step = max(1, batch_rows // periods)
+    names = np.asarray(names, dtype=object)
+    months = np.arange(1, periods + 1)
+    for start in range(0, len(names), step):
+        stop = min(start + step, len(names))
+        batch = {
+            'scenario': np.repeat(names[start:stop], periods),
+            'month': np.tile(months, stop - start),
+        }
+        for name in SERIES_COLUMNS:
+            batch[name] = results[name][start:stop].ravel()
+        yield batch
+
+def batches_from_results(results, batch_rows=DEFAULT_BATCH_ROWS):
+    # ScenarioResult 的可迭代物件（例如 table.process_scenario 的結果）→ 長表批次
+    pending, rows = [], 0
+    for result in results:
+        pending.append(result)
+        rows += len(result)
+        if rows >= batch_rows:
+            yield _concat(pending)
+            pending, rows = [], 0
+    if pending:
+        yield _concat(pending)
+
+def _concat(results):
+    batch = {
+        'scenario': np.concatenate([np.full(len(r), r.scenario, dtype=object) for r in results]),
+        'month': np.concatenate([r.months for r in results]),
+    }
+    for name in SERIES_COLUMNS:
+        batch[name] = np.concatenate([getattr(r, name) for r in results])
+    return batch
+
+def batches_from_params(params, horizon, names=None, batch_rows=DEFAULT_BATCH_ROWS, revenue_model=None):
+    # 逐批模擬 (N, P) 參數陣列並產生長表批次；names 預設為列號
+    horizon = as_horizon(horizon)
+    chunk = chunk_rows(horizon, EXPORT_CHUNK_CELLS)
+    for start in range(0, len(params), chunk):
+        stop = min(start + chunk, len(params))
+        with span('export.simulate', rows=stop - start):
+            results = simulate_batch(params[start:stop], horizon, revenue_model)
+        chunk_names = np.arange(start, stop) if names is None else names[start:stop]
+        yield from batches_from_batch(chunk_names, results, batch_rows)
+
+# ============================================
+# 寫出器：每批一次整批寫入
+# ============================================
+
+def _python_values(batch):
+    # 欄位轉為 Python 純量串列（整批轉換，比逐格存取 numpy 純量快得多）
+    return [batch[name].tolist() for name in COLUMNS]
+
+def write_csv(batches, f):
+    writer = csv.writer(f, lineterminator='\n')
+    writer.writerow(COLUMNS)
+    rows = 0
+    for batch in batches:
+        columns = _python_values(batch)
+        writer.writerows(zip(*columns))
+        rows += len(columns[0])
+    return rows
+
+# JSONL 每列的樣板；數值直接以 repr 輸出，避免逐列建立 dict 再 json.dumps
+_JSONL_ROW = '{{"scenario": {}, "month": {}, ' + ', '.join(f'"{name}": {{}}' for name in SERIES_COLUMNS) + '}}\n'
+
+def _json_numbers(column):
+    # inf / nan 不是合法 JSON，以 null 表示
+    values = list(map(repr, column.tolist()))
+    if not np.isfinite(column).all():
+        for i in np.flatnonzero(~np.isfinite(column)):
+            values[i] = 'null'
+    return values
+
+def write_jsonl(batches, f):
+    rows = 0
+    names = {}
+    for batch in batches:
+        scenarios = [
+            names.get(name) or names.setdefault(name, json.dumps(str(name), ensure_ascii=False))
+            for name in batch['scenario'].tolist()
+        ]
+        numeric = [_json_numbers(np.asarray(batch[name], dtype=float)) for name in SERIES_COLUMNS]
+        f.write(''.join(_JSONL_ROW.format(*row) for row in zip(scenarios, batch['month'].tolist(), *numeric)))
+        rows += len(scenarios)
+        if len(names) > DEFAULT_BATCH_ROWS:
+            names.clear()
+    return rows
+
+def write_parquet(batches, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ValueError("Parquet 匯出需要安裝 pyarrow（pip install pyarrow）") from e
+
+    schema = pa.schema(
+        [('scenario', pa.string()), ('month', pa.int32())] + [(name, pa.float64()) for name in SERIES_COLUMNS]
+    )
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            arrays = [pa.array(batch['scenario'].astype(str)), pa.array(batch['month'], type=pa.int32())]
+            arrays += [pa.array(batch[name]) for name in SERIES_COLUMNS]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))  # 每批為一個 row group
+            rows += len(batch['month'])
+    return rows
+
+def infer_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in FORMATS:
+        return extension
+    raise ValueError(f"無法由副檔名判斷格式: {path}（可用: {', '.join(FORMATS)}）")
+
+def export(batches, path, fmt=None):
+    # 將批次寫入 path（'-' 為標準輸出，僅 CSV/JSONL）；先寫暫存檔再置換，中斷時不留半份檔案
+    # 回傳寫出的列數
+    fmt = fmt or infer_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"不支援的格式: {fmt}")
+    if path == '-':
+        if fmt == 'parquet':
+            raise ValueError("Parquet 無法寫至標準輸出")
+        return (write_csv if fmt == 'csv' else write_jsonl)(batches, sys.stdout)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with span('export.write', format=fmt):
+            if fmt == 'parquet':
+                rows = write_parquet(batches, tmp_path)
+            else:
+                with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                    rows = (write_csv if fmt == 'csv' else write_jsonl)(batches, f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return rows
+
+def export_results(results, path, fmt=None, batch_rows=DEFAULT_BATCH_ROWS):
+    # ScenarioResult 清單 → 檔案
+    return export(batches_from_results(results, batch_rows), path, fmt)
@@ -0,0 +1,176 @@
+# ============================================
+# AFFINITY財務模擬：增量重算的階段相依圖
+# ============================================
+#
+# 模型表示為小型 DAG：growth → mau → revenue → cash_flow → balance → metrics。
+# 修改參數時只把受影響的階段及其下游標記為 dirty，讀取結果時才重算；
+# 只改成本時，現金流僅重算受影響的期數，累積餘額以差額平移後續各期。
+# 適用於互動式 what-if 調整；參數可為純量或 (N,) 陣列（批次情境）。
+
+from collections import Counter
+
+import numpy as np
+
+from engine import (
+    PARAM_NAMES, as_horizon, batch_cash_flow, batch_growth_rates, batch_mau, batch_metrics, batch_revenues,
+)
+
+# 每個階段直接依賴的參數
+STAGE_PARAMS = {
+    'growth': ('initial_growth_rate', 'final_growth_rate'),
+    'mau': (),
+    'revenue': ('subscription_rate', 'monthly_subscription_price', 'annual_subscription_price', 'rpm'),
+    'cash_flow': ('personnel_cost_low', 'personnel_cost_high', 'operational_cost'),
+    'balance': ('initial_capital',),
+    'metrics': (),
+}
+# 每個階段的上游階段（依計算順序排列）
+STAGE_DEPS = {
+    'growth': (),
+    'mau': ('growth',),
+    'revenue': ('mau',),
+    'cash_flow': ('revenue',),
+    'balance': ('cash_flow',),
+    'metrics': ('balance',),
+}
+STAGE_ORDER = tuple(STAGE_DEPS)
+PARAM_STAGE = {param: stage for stage, params in STAGE_PARAMS.items() for param in params}
+
+# 各輸出所屬的階段
+OUTPUT_STAGE = {
+    'growth_rates': 'growth',
+    'mau': 'mau',
+    'subscription_revenue': 'revenue',
+    'ad_revenue': 'revenue',
+    'monthly_revenue': 'revenue',
+    'cash_flow': 'cash_flow',
+    'cumulative_surplus': 'cash_flow',
+    'cash_balance': 'balance',
+    'metrics': 'metrics',
+}
+
+def _descendants(stage):
+    found = []
+    for candidate in STAGE_ORDER:
+        if candidate != stage and any(dep == stage or dep in found for dep in STAGE_DEPS[candidate]):
+            found.append(candidate)
+    return found
+
+class ScenarioGraph:
+    # 持有參數、各階段結果與 dirty 標記
+
+    def __init__(self, horizon, **params):
+        missing = [name for name in PARAM_NAMES if name not in params]
+        if missing:
+            raise ValueError(f"缺少參數: {', '.join(missing)}")
+        self.horizon = as_horizon(horizon)
+        self.params = {name: np.atleast_1d(np.asarray(params[name], dtype=float)) for name in PARAM_NAMES}
+        self.values = {}
+        self.dirty = set(STAGE_ORDER)
+        # 只改成本時，cash_flow 階段待重算的期數範圍 [start, stop)
+        self.dirty_periods = None
+        self.recomputed = Counter()
+
+    # ---------- 修改參數 ----------
+
+    def set(self, **changes):
+        ramp = self.horizon.ramp_periods
+        for name, value in changes.items():
+            if name not in PARAM_STAGE:
+                raise ValueError(f"未知參數: {name}")
+            value = np.atleast_1d(np.asarray(value, dtype=float))
+            if value.shape == self.params[name].shape and np.array_equal(value, self.params[name]):
+                continue
+            self.params[name] = value
+            stage = PARAM_STAGE[name]
+            if stage == 'cash_flow' and 'cash_flow' not in self.dirty:
+                # 成本只影響部分期數：低月人事成本僅前期、高月人事成本僅後續各期
+                start, stop = {
+                    'personnel_cost_low': (0, ramp),
+                    'personnel_cost_high': (ramp, self.horizon.periods),
+                    'operational_cost': (0, self.horizon.periods),
+                }[name]
+                if self.dirty_periods is not None:
+                    start, stop = min(start, self.dirty_periods[0]), max(stop, self.dirty_periods[1])
+                self.dirty_periods = (start, stop)
+                self.dirty.update(_descendants('cash_flow'))
+            else:
+                self.dirty.add(stage)
+                self.dirty.update(_descendants(stage))
+                if stage in ('growth', 'mau', 'revenue'):
+                    self.dirty_periods = None
+
+    # ---------- 讀取結果 ----------
+
+    def __getitem__(self, output):
+        if output not in OUTPUT_STAGE:
+            raise KeyError(output)
+        self._ensure(OUTPUT_STAGE[output])
+        value = self.values[output]
+        if isinstance(value, np.ndarray):
+            value = value.view()
+            value.setflags(write=False)
+        return value
+
+    def _ensure(self, stage):
+        for dep in STAGE_DEPS[stage]:
+            self._ensure(dep)
+        if stage == 'cash_flow' and stage not in self.dirty and self.dirty_periods is not None:
+            self._update_cash_flow(*self.dirty_periods)
+            self.dirty_periods = None
+            self.recomputed['cash_flow (partial)'] += 1
+        elif stage in self.dirty:
+            getattr(self, f'_compute_{stage}')()
+            self.dirty.discard(stage)
+            if stage == 'cash_flow':
+                self.dirty_periods = None
+            self.recomputed[stage] += 1
+
+    # ---------- 各階段計算 ----------
+
+    def _compute_growth(self):
+        p = self.params
+        self.values['growth_rates'] = batch_growth_rates(self.horizon, p['initial_growth_rate'], p['final_growth_rate'])
+
+    def _compute_mau(self):
+        self.values['mau'] = batch_mau(self.values['growth_rates'], self.horizon)
+
+    def _compute_revenue(self):
+        p = self.params
+        subscription_revenue, ad_revenue, monthly_revenue = batch_revenues(
+            self.values['mau'], p['subscription_rate'], p['monthly_subscription_price'],
+            p['annual_subscription_price'], p['rpm'], self.horizon
+        )
+        self.values.update(subscription_revenue=subscription_revenue, ad_revenue=ad_revenue, monthly_revenue=monthly_revenue)
+
+    def _compute_cash_flow(self):
+        p = self.params
+        cash_flow, cumulative_surplus = batch_cash_flow(
+            self.values['monthly_revenue'], p['personnel_cost_low'], p['personnel_cost_high'], p['operational_cost'], self.horizon
+        )
+        self.values.update(cash_flow=cash_flow, cumulative_surplus=cumulative_surplus)
+
+    def _update_cash_flow(self, start, stop):
+        # 僅重算 [start, stop) 期的現金流；之後各期的累積餘額只需加上差額總和
+        p = self.params
+        revenue = self.values['monthly_revenue'][:, start:stop]
+        in_ramp = np.arange(start, stop) < self.horizon.ramp_periods
+        personnel_costs = np.where(in_ramp, p['personnel_cost_low'][:, None], p['personnel_cost_high'][:, None])
+        new_cash_flow = revenue - self.horizon.per_period(personnel_costs + p['operational_cost'][:, None])
+
+        # 複製後再更新，先前回傳給呼叫端的結果不受影響；參數改為批次時列數隨之擴展
+        shape = (max(self.values['cash_flow'].shape[0], new_cash_flow.shape[0]), self.horizon.periods)
+        cash_flow = np.broadcast_to(self.values['cash_flow'], shape).copy()
+        cumulative_surplus = np.broadcast_to(self.values['cumulative_surplus'], shape).copy()
+        delta = (new_cash_flow - cash_flow[:, start:stop]).sum(axis=1)
+        cash_flow[:, start:stop] = new_cash_flow
+        before = cumulative_surplus[:, start - 1:start] if start > 0 else 0
+        cumulative_surplus[:, start:stop] = before + np.cumsum(new_cash_flow, axis=1)
+        cumulative_surplus[:, stop:] += delta[:, None]
+        self.values.update(cash_flow=cash_flow, cumulative_surplus=cumulative_surplus)
+
+    def _compute_balance(self):
+        self.values['cash_balance'] = self.params['initial_capital'][:, None] + self.values['cumulative_surplus']
+
+    def _compute_metrics(self):
+        self.values['metrics'] = batch_metrics(self.values)
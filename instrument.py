@@ -0,0 +1,182 @@
+# ============================================
+# AFFINITY財務模擬：效能量測（計時、計數、巢狀區段）
+# ============================================
+#
+# 以環境變數 AFFINITY_TRACE=<輸出路徑>（或 cli.py --trace）啟用。
+# 啟用後在程式結束時寫出 Chrome trace 格式的 JSON（可用 chrome://tracing 或 Perfetto 開啟），
+# 並在 stderr 輸出依總耗時排序的文字摘要。
+# 未啟用時：@traced 直接回傳原函式（零額外成本）；span() 回傳共用的空 context manager。
+# 注意 @traced 在模組載入時決定是否包裝，因此 enable() 需在載入被量測模組之前呼叫。
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+ENV_VAR = "AFFINITY_TRACE"
+
+_enabled = False
+_path = None
+_events = []
+_counters = Counter()
+_lock = threading.Lock()
+
+def _now_us():
+    return time.perf_counter_ns() / 1000
+
+# ============================================
+# 啟用
+# ============================================
+
+def enabled():
+    return _enabled
+
+def enable(path):
+    # 啟用量測；子行程透過環境變數繼承設定
+    global _enabled, _path
+    if _enabled:
+        return
+    _enabled = True
+    _path = path
+    os.environ[ENV_VAR] = path
+    atexit.register(_write_report)
+
+# ============================================
+# 區段與計數
+# ============================================
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, *exc):
+        end = _now_us()
+        event = {
+            'name': self.name, 'ph': 'X', 'ts': self.start, 'dur': end - self.start,
+            'pid': os.getpid(), 'tid': threading.get_ident(),
+        }
+        if self.args:
+            event['args'] = self.args
+        with _lock:
+            _events.append(event)
+        return False
+
+def span(name, **args):
+    # with span("render.savefig", filename=...): ...
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+def traced(name):
+    # 函式裝飾器；未啟用時原封不動回傳
+    def decorator(func):
+        if not _enabled:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Span(name, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name, n=1):
+    if _enabled:
+        with _lock:
+            _counters[name] += n
+
+# ============================================
+# 跨行程合併
+# ============================================
+
+def _reset_after_fork():
+    # fork 出的工作行程會繼承主行程已記錄的事件與計數；清空後 drain() 只回傳本行程的部分，
+    # 否則 merge() 會把主行程的計數每個工作重複加回一次
+    global _lock
+    _lock = threading.Lock()
+    _events.clear()
+    _counters.clear()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def drain():
+    # 取出並移除本行程記錄的事件與計數（供工作行程回傳給主行程）
+    if not _enabled:
+        return None
+    with _lock:
+        events = list(_events)
+        counters = dict(_counters)
+        _events.clear()
+        _counters.clear()
+    return {'events': events, 'counters': counters}
+
+def merge(payload):
+    if not _enabled or not payload:
+        return
+    with _lock:
+        _events.extend(payload['events'])
+        _counters.update(payload['counters'])
+
+# ============================================
+# 輸出
+# ============================================
+
+def summary_lines():
+    totals = {}
+    for event in _events:
+        entry = totals.setdefault(event['name'], [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += event['dur']
+        entry[2] = max(entry[2], event['dur'])
+    lines = [f"{'區段':<36}{'次數':>8}{'總計 ms':>12}{'平均 ms':>10}{'最大 ms':>10}"]
+    for name, (calls, total, longest) in sorted(totals.items(), key=lambda item: -item[1][1]):
+        lines.append(f"{name:<38}{calls:>8}{total / 1000:>12.2f}{total / calls / 1000:>10.3f}{longest / 1000:>10.2f}")
+    for name, value in sorted(_counters.items()):
+        lines.append(f"{name:<38}{value:>8}")
+    return lines
+
+def _write_report():
+    # 只由主行程寫出（工作行程的事件已透過 drain/merge 合併回主行程）
+    import multiprocessing
+    if multiprocessing.parent_process() is not None:
+        return
+    if not _events and not _counters:
+        return
+    with _lock:
+        trace = {
+            'traceEvents': sorted(_events, key=lambda event: event['ts']),
+            'displayTimeUnit': 'ms',
+            'otherData': {'counters': dict(_counters)},
+        }
+    with open(_path, 'w', encoding='utf-8') as f:
+        json.dump(trace, f, ensure_ascii=False)
+    print("\n==================== 效能量測 ====================", file=sys.stderr)
+    for line in summary_lines():
+        print(line, file=sys.stderr)
+    print(f"trace 已儲存至: {_path}", file=sys.stderr)
+
+if os.environ.get(ENV_VAR):
+    enable(os.environ[ENV_VAR])
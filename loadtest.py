@@ -0,0 +1,82 @@
+# ============================================
+# AFFINITY財務模擬：what-if 服務壓力測試
+# ============================================
+#
+# 以多條 keep-alive 連線持續送出 POST /scenario，回報每秒查詢數與延遲百分位。
+# 預設每個查詢的訂閱率與 RPM 皆不同，避免全部命中快取。
+# 用法：先執行 python service.py，再執行 python loadtest.py --connections 64 --duration 10
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from service import DEFAULT_HOST, DEFAULT_PORT
+
+async def _client(host, port, deadline, latencies, errors, distinct, include_series, rng):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            payload = {'series': include_series}
+            if distinct:
+                payload['subscription_rate'] = round(rng.uniform(0.01, 0.03), 6)
+                payload['rpm'] = round(rng.uniform(40, 90), 3)
+            body = json.dumps(payload).encode('utf-8')
+            request = (
+                f"POST /scenario HTTP/1.1\r\nHost: {host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+            ).encode('ascii') + body
+            start = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if not head.startswith(b"HTTP/1.1 200"):
+                errors.append(head.split(b"\r\n", 1)[0].decode('latin-1'))
+    finally:
+        writer.close()
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(int(q / 100 * len(sorted_values)), len(sorted_values) - 1)]
+
+async def run(host, port, connections, duration, distinct, include_series, seed):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        _client(host, port, deadline, latencies, errors, distinct, include_series, random.Random(rng.random()))
+        for _ in range(connections)
+    ])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    print("\n==================== 壓力測試結果 ====================")
+    print(f"連線數: {connections}，時間: {elapsed:.1f} 秒，查詢數: {len(latencies):,}，錯誤: {len(errors):,}")
+    print(f"每秒查詢數: {len(latencies) / elapsed:,.0f}")
+    print(f"延遲 P50: {_percentile(latencies, 50) * 1000:.2f} ms  "
+          f"P95: {_percentile(latencies, 95) * 1000:.2f} ms  "
+          f"P99: {_percentile(latencies, 99) * 1000:.2f} ms")
+    print("================================================")
+
+def main():
+    parser = argparse.ArgumentParser(description="AFFINITY what-if 服務壓力測試")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--connections', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.0, help="測試秒數")
+    parser.add_argument('--same-params', action='store_true', help="所有查詢使用相同參數（測試快取）")
+    parser.add_argument('--series', action='store_true', help="回應包含完整月序列")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port, args.connections, args.duration, not args.same_params, args.series, args.seed))
+
+if __name__ == "__main__":
+    main()
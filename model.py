@@ -0,0 +1,199 @@
+# ============================================
+# AFFINITY財務模擬：共用模型核心
+# ============================================
+#
+# 假設因子（載入自情境檔 scenarios.toml）與計算函式的唯一來源，main.py（繪圖）與 table.py（表格）皆由此匯入。
+# 情境流程依序為 成長率 → MAU → 收入 → 現金流 → 現金水位，
+# 每個階段以有上限的 LRU 快取記憶（鍵為該階段的確切輸入），
+# 同一次執行中圖表與表格使用相同情境時不會重複計算。
+
+from functools import lru_cache
+
+import numpy as np
+
+from engine import (
+    PARAM_NAMES, as_horizon, batch_breakeven_month, batch_cash_flow, batch_growth_rates, batch_mau, batch_revenues,
+    breakeven_or_none, pack_params,
+)
+from instrument import traced
+from results import ScenarioResult
+from scenarios import load_scenarios
+
+# ============================================
+# 各項假設因子（由情境檔 scenarios.toml 載入，見 scenarios.py）
+# ============================================
+
+SCENARIO_FILE = load_scenarios()
+
+# 總模擬月份
+MONTHS_TOTAL = SCENARIO_FILE['settings']['months_total']
+
+# 高亮月份
+HIGHLIGHT_MONTHS = list(SCENARIO_FILE['settings']['highlight_months'])
+
+# 依檔案順序的所有情境 {鍵: {'name': 顯示名稱, 'params': {參數: 值}}}
+SCENARIOS = SCENARIO_FILE['scenarios']
+
+# 未指定情境時的基準情境：有 baseline 時用之，否則為檔案中的第一個情境
+DEFAULT_SCENARIO = 'baseline' if 'baseline' in SCENARIOS else next(iter(SCENARIOS))
+
+def scenario_params(key=None):
+    # 情境鍵 → 以參數名稱(engine.PARAM_NAMES)為鍵的情境參數；key=None 為基準情境
+    key = DEFAULT_SCENARIO if key is None else key
+    if key not in SCENARIOS:
+        raise KeyError(f"情境檔中沒有情境 {key!r}（可用: {', '.join(SCENARIOS)}）")
+    return SCENARIOS[key]['params']
+
+def scenario_batch(keys=None):
+    # 情境鍵（預設為全部情境，依檔案順序）→ (顯示名稱串列, (N, P) 參數陣列)，供批次引擎一次計算
+    keys = list(SCENARIOS) if keys is None else list(keys)
+    names = [SCENARIOS[key]['name'] for key in keys]
+    return names, pack_params(**{name: [scenario_params(key)[name] for key in keys] for name in PARAM_NAMES})
+
+# 沿用原有名稱的個別因子（BASELINE_RPM、CONSERVATIVE_PARAMS、INITIAL_CAPITAL 等），
+# 僅在情境檔含對應情境時於取用時產生，其他情境檔仍可正常匯入本模組
+_LEGACY_FACTORS = {
+    'INITIAL_GROWTH_RATE': 'initial_growth_rate',
+    'FINAL_GROWTH_RATE': 'final_growth_rate',
+    'MONTHLY_SUB_PRICE': 'monthly_subscription_price',
+    'ANNUAL_SUB_PRICE': 'annual_subscription_price',
+    'SUBSCRIPTION_RATE': 'subscription_rate',
+    'RPM': 'rpm',
+    'PERSONNEL_COST_LOW': 'personnel_cost_low',
+    'PERSONNEL_COST_HIGH': 'personnel_cost_high',
+    'OPERATIONAL_COST': 'operational_cost',
+    'INITIAL_CAPITAL': 'initial_capital',
+}
+
+def __getattr__(name):
+    if name == 'INITIAL_CAPITAL':
+        name = 'BASELINE_INITIAL_CAPITAL'
+    prefix, _, factor = name.partition('_')
+    if prefix in ('BASELINE', 'CONSERVATIVE') and (factor == 'PARAMS' or factor in _LEGACY_FACTORS):
+        key = prefix.lower()
+        if key not in SCENARIOS:
+            raise AttributeError(f"情境檔中沒有情境 {key!r}，無法取得 {name}（請改用 model.SCENARIOS）")
+        params = SCENARIOS[key]['params']
+        return params if factor == 'PARAMS' else params[_LEGACY_FACTORS[factor]]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ============================================
+# 單一情境計算函式（批次引擎的薄包裝）
+# ============================================
+
+def calculate_mau(months_total, initial_growth_rate, final_growth_rate):
+    # 前兩個月 MAU 為 0，第三個月(程式的month=2)開始以凸性指數型下降的成長率累乘
+    growth_rates = batch_growth_rates(months_total, initial_growth_rate, final_growth_rate)
+    return batch_mau(growth_rates)[0].tolist()
+
+def calculate_revenues(mau_data, subscription_rate, monthly_subscription_price, annual_subscription_price, rpm):
+    mau = np.asarray(mau_data, dtype=float).reshape(1, -1)
+    subscription_revenue, ad_revenue, monthly_revenue = batch_revenues(
+        mau, subscription_rate, monthly_subscription_price, annual_subscription_price, rpm
+    )
+    return subscription_revenue[0].tolist(), ad_revenue[0].tolist(), monthly_revenue[0].tolist()
+
+def calculate_cash_flow(monthly_revenue, personnel_cost_low, personnel_cost_high, operational_cost):
+    revenue = np.asarray(monthly_revenue, dtype=float).reshape(1, -1)
+    cash_flow, cumulative_surplus = batch_cash_flow(revenue, personnel_cost_low, personnel_cost_high, operational_cost)
+    breakeven_month = breakeven_or_none(batch_breakeven_month(cumulative_surplus)[0])
+    return cash_flow[0].tolist(), cumulative_surplus[0].tolist(), breakeven_month
+
+# ============================================
+# 記憶化的情境流程
+# ============================================
+
+# 每個階段最多保留的結果數
+STAGE_CACHE_SIZE = 256
+
+def _frozen(*arrays):
+    # 快取中的陣列設為唯讀，避免呼叫端修改到共用結果
+    for array in arrays:
+        array.setflags(write=False)
+    return arrays if len(arrays) > 1 else arrays[0]
+
+@lru_cache(maxsize=STAGE_CACHE_SIZE)
+@traced('model.growth_stage')
+def growth_stage(horizon, initial_growth_rate, final_growth_rate):
+    return _frozen(batch_growth_rates(horizon, initial_growth_rate, final_growth_rate)[0])
+
+@lru_cache(maxsize=STAGE_CACHE_SIZE)
+@traced('model.mau_stage')
+def mau_stage(horizon, initial_growth_rate, final_growth_rate):
+    growth_rates = growth_stage(horizon, initial_growth_rate, final_growth_rate)
+    return _frozen(batch_mau(growth_rates.reshape(1, -1), horizon)[0])
+
+@lru_cache(maxsize=STAGE_CACHE_SIZE)
+@traced('model.revenue_stage')
+def revenue_stage(horizon, initial_growth_rate, final_growth_rate, subscription_rate, monthly_subscription_price, annual_subscription_price, rpm):
+    mau = mau_stage(horizon, initial_growth_rate, final_growth_rate)
+    subscription_revenue, ad_revenue, monthly_revenue = batch_revenues(
+        mau.reshape(1, -1), subscription_rate, monthly_subscription_price, annual_subscription_price, rpm, horizon
+    )
+    return _frozen(subscription_revenue[0], ad_revenue[0], monthly_revenue[0])
+
+@lru_cache(maxsize=STAGE_CACHE_SIZE)
+@traced('model.cash_flow_stage')
+def cash_flow_stage(horizon, revenue_key, personnel_cost_low, personnel_cost_high, operational_cost):
+    # revenue_key: revenue_stage 的參數組
+    monthly_revenue = revenue_stage(horizon, *revenue_key)[2]
+    cash_flow, cumulative_surplus = batch_cash_flow(
+        monthly_revenue.reshape(1, -1), personnel_cost_low, personnel_cost_high, operational_cost, horizon
+    )
+    return _frozen(cash_flow[0], cumulative_surplus[0])
+
+@lru_cache(maxsize=STAGE_CACHE_SIZE)
+@traced('model.balance_stage')
+def balance_stage(horizon, cash_flow_key, initial_capital):
+    # cash_flow_key: cash_flow_stage 除 horizon 外的參數組
+    cumulative_surplus = cash_flow_stage(horizon, *cash_flow_key)[1]
+    return _frozen(initial_capital + cumulative_surplus)
+
+STAGES = {
+    'growth': growth_stage,
+    'mau': mau_stage,
+    'revenue': revenue_stage,
+    'cash_flow': cash_flow_stage,
+    'balance': balance_stage,
+}
+
+def cache_stats():
+    # 各階段快取的命中/未命中次數
+    return {
+        name: {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxsize': info.maxsize}
+        for name, info in ((name, stage.cache_info()) for name, stage in STAGES.items())
+    }
+
+def clear_caches():
+    for stage in STAGES.values():
+        stage.cache_clear()
+
+@traced('model.simulate_scenario')
+def simulate_scenario(scenario_name, horizon, **params):
+    # 以記憶化的各階段組出單一情境的 ScenarioResult；params 需包含所有 PARAM_NAMES
+    horizon = as_horizon(horizon)
+    p = {name: float(value) for name, value in params.items()}
+    revenue_key = (
+        p['initial_growth_rate'], p['final_growth_rate'], p['subscription_rate'],
+        p['monthly_subscription_price'], p['annual_subscription_price'], p['rpm'],
+    )
+    cash_flow_key = (revenue_key, p['personnel_cost_low'], p['personnel_cost_high'], p['operational_cost'])
+
+    growth_rates = growth_stage(horizon, p['initial_growth_rate'], p['final_growth_rate'])
+    mau = mau_stage(horizon, p['initial_growth_rate'], p['final_growth_rate'])
+    subscription_revenue, ad_revenue, monthly_revenue = revenue_stage(horizon, *revenue_key)
+    cash_flow, cumulative_surplus = cash_flow_stage(horizon, *cash_flow_key)
+    cash_balance = balance_stage(horizon, cash_flow_key, p['initial_capital'])
+
+    return ScenarioResult(
+        scenario_name,
+        breakeven_or_none(batch_breakeven_month(cumulative_surplus.reshape(1, -1))[0]),
+        mau=mau,
+        subscription_revenue=subscription_revenue,
+        ad_revenue=ad_revenue,
+        monthly_revenue=monthly_revenue,
+        cash_flow=cash_flow,
+        cumulative_surplus=cumulative_surplus,
+        cash_balance=cash_balance,
+        growth_rates=growth_rates,
+    )
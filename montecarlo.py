@@ -0,0 +1,244 @@
+# ============================================
+# AFFINITY財務模擬：假設不確定性的 Monte Carlo 模式
+# ============================================
+#
+# 從可設定的分布抽樣各項假設因子，分批(chunk)送入批次引擎，
+# 以固定記憶體的直方圖串流估計每月現金水位的百分位帶與損益平衡月份分布，
+# 百分位估計收斂後即提早停止。
+
+import numpy as np
+
+from engine import PARAM_NAMES, as_horizon, chunk_rows, pack_params, simulate_batch
+
+# 每月直方圖的分箱數
+DEFAULT_BINS = 4096
+DEFAULT_PERCENTILES = (5, 50, 95)
+
+# ============================================
+# 分布與抽樣
+# ============================================
+
+# Acklam 反常態分布近似（相對誤差約 1e-9），讓擬隨機序列也能轉成常態分布
+_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+      1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+      6.680131188771972e+01, -1.328068155288572e+01)
+_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+      -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+      3.754408661907416e+00)
+_P_LOW = 0.02425
+
+def _norm_ppf(u):
+    u = np.clip(u, 1e-12, 1 - 1e-12)
+    z = np.empty_like(u)
+    low = u < _P_LOW
+    high = u > 1 - _P_LOW
+    mid = ~(low | high)
+
+    q = np.sqrt(-2 * np.log(u[low]))
+    z[low] = (((((_C[0] * q + _C[1]) * q + _C[2]) * q + _C[3]) * q + _C[4]) * q + _C[5]) / \
+             ((((_D[0] * q + _D[1]) * q + _D[2]) * q + _D[3]) * q + 1)
+    q = np.sqrt(-2 * np.log(1 - u[high]))
+    z[high] = -(((((_C[0] * q + _C[1]) * q + _C[2]) * q + _C[3]) * q + _C[4]) * q + _C[5]) / \
+              ((((_D[0] * q + _D[1]) * q + _D[2]) * q + _D[3]) * q + 1)
+    q = u[mid] - 0.5
+    r = q * q
+    z[mid] = (((((_A[0] * r + _A[1]) * r + _A[2]) * r + _A[3]) * r + _A[4]) * r + _A[5]) * q / \
+             (((((_B[0] * r + _B[1]) * r + _B[2]) * r + _B[3]) * r + _B[4]) * r + 1)
+    return z
+
+def _inverse_cdf(spec, u):
+    # spec 例如 {'dist': 'triangular', 'low': 0.2, 'mode': 0.34, 'high': 0.4}
+    dist = spec['dist']
+    if dist == 'uniform':
+        values = spec['low'] + u * (spec['high'] - spec['low'])
+    elif dist == 'triangular':
+        low, mode, high = spec['low'], spec['mode'], spec['high']
+        split = (mode - low) / (high - low)
+        values = np.where(
+            u < split,
+            low + np.sqrt(u * (high - low) * (mode - low)),
+            high - np.sqrt((1 - u) * (high - low) * (high - mode)),
+        )
+    elif dist == 'normal':
+        values = spec['mean'] + spec['std'] * _norm_ppf(u)
+    elif dist == 'lognormal':
+        values = spec['median'] * np.exp(spec['sigma'] * _norm_ppf(u))
+    else:
+        raise ValueError(f"不支援的分布: {dist}")
+    if 'min' in spec or 'max' in spec:
+        values = np.clip(values, spec.get('min', -np.inf), spec.get('max', np.inf))
+    return values
+
+def _uniform_source(dimensions, sampler, seed):
+    # 回傳 draw(n) -> (n, dimensions) 的 [0, 1) 均勻抽樣函式
+    if sampler == 'random':
+        rng = np.random.default_rng(seed)
+        return lambda n: rng.random((n, dimensions))
+    if sampler == 'sobol':
+        from scipy.stats import qmc  # 僅在使用 Sobol 時需要 scipy
+        engine = qmc.Sobol(d=dimensions, scramble=True, seed=seed)
+        return lambda n: engine.random(n)
+    raise ValueError(f"不支援的抽樣方式: {sampler}")
+
+def sample_params(distributions, fixed, n, draw):
+    # 依 distributions 抽樣、其餘參數取 fixed，組成 (n, P) 參數陣列
+    sampled = sorted(distributions)
+    u = draw(n)
+    columns = dict(fixed)
+    for i, name in enumerate(sampled):
+        columns[name] = _inverse_cdf(distributions[name], u[:, i])
+    return pack_params(**{name: columns[name] for name in PARAM_NAMES})
+
+# ============================================
+# 串流百分位（固定分箱直方圖）
+# ============================================
+
+class StreamingPercentiles:
+    # 每期一組直方圖；分箱範圍由第一批資料決定，超出範圍者計入頭尾溢出箱
+
+    def __init__(self, periods, bins=DEFAULT_BINS):
+        self.periods = periods
+        self.bins = bins
+        self.count = 0
+        self.counts = np.zeros((periods, bins + 2), dtype=np.int64)
+        self.low = None
+        self.width = None
+        self.observed_min = np.full(periods, np.inf)
+        self.observed_max = np.full(periods, -np.inf)
+
+    def update(self, values):
+        # values: (n, periods)
+        if self.low is None:
+            vmin, vmax = values.min(axis=0), values.max(axis=0)
+            margin = np.maximum((vmax - vmin) * 0.5, 1.0)
+            self.low = vmin - margin
+            self.width = (vmax + margin - self.low) / self.bins
+        self.observed_min = np.minimum(self.observed_min, values.min(axis=0))
+        self.observed_max = np.maximum(self.observed_max, values.max(axis=0))
+        idx = np.floor((values - self.low) / self.width).astype(np.int64)
+        np.clip(idx, -1, self.bins, out=idx)
+        idx += 1 + np.arange(self.periods) * (self.bins + 2)
+        self.counts += np.bincount(idx.ravel(), minlength=self.counts.size).reshape(self.counts.shape)
+        self.count += values.shape[0]
+
+    def percentiles(self, percentiles=DEFAULT_PERCENTILES):
+        # 回傳 {百分位: (periods,) 陣列}，箱內以線性內插估計
+        edges = self.low[:, None] + self.width[:, None] * np.arange(self.bins + 1)
+        lower = np.concatenate([np.minimum(self.observed_min, self.low)[:, None], edges], axis=1)
+        upper = np.concatenate([edges, np.maximum(self.observed_max, edges[:, -1])[:, None]], axis=1)
+        cumulative = np.cumsum(self.counts, axis=1)
+        rows = np.arange(self.periods)
+        result = {}
+        for q in percentiles:
+            target = q / 100 * self.count
+            bin_idx = np.argmax(cumulative >= target, axis=1)
+            before = np.where(bin_idx > 0, cumulative[rows, bin_idx - 1], 0)
+            in_bin = np.maximum(self.counts[rows, bin_idx], 1)
+            fraction = np.clip((target - before) / in_bin, 0, 1)
+            lo, hi = lower[rows, bin_idx], upper[rows, bin_idx]
+            result[q] = lo + fraction * (hi - lo)
+        return result
+
+# ============================================
+# Monte Carlo 主流程
+# ============================================
+
+def _chunk_size(horizon, limit=None):
+    # 不超過 engine.chunk_rows() 的最大 2 的次方抽樣數（Sobol 序列以此為佳），再套用呼叫端的上限
+    size = 1 << (chunk_rows(horizon).bit_length() - 1)
+    return min(size, limit) if limit else size
+
+def run_monte_carlo(
+    distributions,
+    fixed,
+    horizon,
+    max_draws=10 ** 7,
+    chunk_size=None,
+    sampler='random',
+    seed=None,
+    percentiles=DEFAULT_PERCENTILES,
+    bins=DEFAULT_BINS,
+    tolerance=1e-3,
+    patience=3,
+    min_draws=None,
+):
+    # distributions: {參數名稱: 分布設定}；fixed: 其餘參數的固定值
+    # chunk_size: 每批抽樣數的上限（選擇性）；實際批次大小另依期數由 engine.chunk_rows() 限制，記憶體與期數無關
+    overlap = set(distributions) & set(fixed)
+    if overlap:
+        raise ValueError(f"參數同時被抽樣與固定: {', '.join(sorted(overlap))}")
+    horizon = as_horizon(horizon)
+    periods = horizon.periods
+    chunk_size = _chunk_size(horizon, chunk_size)
+    draw = _uniform_source(len(distributions), sampler, seed)
+    bands = StreamingPercentiles(periods, bins)
+    breakeven_histogram = np.zeros(periods + 1, dtype=np.int64)
+    min_draws = chunk_size * (patience + 1) if min_draws is None else min_draws
+
+    previous = None
+    stable_chunks = 0
+    chunks = 0
+    converged = False
+    while bands.count < max_draws:
+        n = min(chunk_size, max_draws - bands.count)
+        results = simulate_batch(sample_params(distributions, fixed, n, draw), horizon)
+        bands.update(results['cash_balance'])
+        breakeven_histogram += np.bincount(results['breakeven_month'], minlength=periods + 1)
+        chunks += 1
+
+        current = bands.percentiles(percentiles)
+        if previous is not None:
+            scale = np.maximum(current[max(percentiles)] - current[min(percentiles)], 1.0)
+            change = max(np.max(np.abs(current[q] - previous[q]) / scale) for q in percentiles)
+            stable_chunks = stable_chunks + 1 if change < tolerance else 0
+        previous = current
+        if stable_chunks >= patience and bands.count >= min_draws:
+            converged = True
+            break
+
+    return {
+        'draws': bands.count,
+        'chunks': chunks,
+        'converged': converged,
+        'cash_balance_percentiles': previous,
+        # 索引 0 為未達損益平衡，其餘為第 n 期達成的情境數
+        'breakeven_histogram': breakeven_histogram,
+    }
+
+# ============================================
+# 主程式
+# ============================================
+
+def main():
+    from model import MONTHS_TOTAL, SCENARIOS, scenario_params
+
+    base = scenario_params()
+    # 各參數在情境檔所有情境中的最小值，作為悲觀下限
+    low = {name: min(s['params'][name] for s in SCENARIOS.values()) for name in PARAM_NAMES}
+
+    # 以悲觀值為下限、基準情境為眾數的三角分布；成本以常態分布描述
+    distributions = {
+        'initial_growth_rate': {'dist': 'triangular', 'low': low['initial_growth_rate'], 'mode': base['initial_growth_rate'], 'high': base['initial_growth_rate'] * 1.1},
+        'final_growth_rate': {'dist': 'triangular', 'low': low['final_growth_rate'], 'mode': base['final_growth_rate'], 'high': base['final_growth_rate'] * 1.1},
+        'subscription_rate': {'dist': 'triangular', 'low': low['subscription_rate'], 'mode': base['subscription_rate'], 'high': base['subscription_rate'] * 1.1},
+        'rpm': {'dist': 'lognormal', 'median': (base['rpm'] + low['rpm']) / 2, 'sigma': 0.15},
+        'personnel_cost_high': {'dist': 'normal', 'mean': base['personnel_cost_high'], 'std': base['personnel_cost_high'] * 0.05, 'min': 0},
+        'operational_cost': {'dist': 'normal', 'mean': base['operational_cost'], 'std': base['operational_cost'] * 0.1, 'min': 0},
+    }
+    fixed = {name: base[name] for name in PARAM_NAMES if name not in distributions}
+    results = run_monte_carlo(distributions, fixed, MONTHS_TOTAL, sampler='random', seed=0)
+
+    print("\n==================== Monte Carlo 摘要 ====================")
+    print(f"抽樣數: {results['draws']:,}（{results['chunks']} 批，{'已收斂' if results['converged'] else '未收斂'}）")
+    bands = results['cash_balance_percentiles']
+    for month in (6, 12, 18, 24, 30, 36):
+        row = "  ".join(f"P{q}: {int(bands[q][month - 1]):>12,}" for q in sorted(bands))
+        print(f"第 {month:>2} 月現金水位  {row}")
+    histogram = results['breakeven_histogram']
+    print(f"未達損益平衡比例: {histogram[0] / results['draws']:.1%}")
+    print("================================================")
+
+if __name__ == "__main__":
+    main()
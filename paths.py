@@ -0,0 +1,122 @@
+# ============================================
+# AFFINITY財務模擬：隨機成長路徑與破產機率
+# ============================================
+#
+# 確定性的成長率曲線（engine.batch_growth_rates）加上每期隨機衝擊：
+#   - lognormal：成長率乘上 exp(σz - σ²/2)（期望值不變）
+#   - regime：兩狀態馬可夫鏈（正常/衰退），衰退期成長率乘上 down_multiplier 再加上 down_shift，
+#             並同樣套用 lognormal 衝擊
+# 每個情境模擬多條路徑，逐期推進；每條路徑只保留 MAU、現金水位、歷史最低現金與景氣狀態，
+# 記憶體與期數無關（約 25 bytes／路徑），路徑再分批處理，數百萬條路徑也能放入記憶體。
+# 逐期累積：
+#   ruin_probability[t]   第 t 期(含)以前現金水位曾降至 ruin_threshold（預設 0）以下（含）的機率
+#   expected_shortfall[t] 在上述已破產路徑中，至第 t 期為止最低現金水位低於 ruin_threshold 的平均缺口（≥ 0，TWD）
+
+import numpy as np
+
+from engine import STARTING_MAU, _column, as_horizon, batch_cash_flow, batch_growth_rates, unpack_params
+from instrument import traced
+
+DEFAULT_PATHS = 10 ** 5
+# 每批的情境×路徑數
+CHUNK_PATHS = 2 ** 18
+
+# 景氣狀態預設值（皆為每月數值）
+REGIME_DEFAULTS = {
+    'p_down': 0.05,           # 正常期每月進入衰退的機率
+    'p_recover': 0.25,        # 衰退期每月恢復的機率
+    'down_multiplier': 0.3,   # 衰退期成長率乘數
+    'down_shift': -0.02,      # 衰退期成長率加減（可使 MAU 下降）
+}
+
+def _monthly_probability_per_period(probability, horizon):
+    # 每月機率換算為每期機率（同一個月內累積機率相同）
+    return 1 - (1 - probability) ** (1 / horizon.periods_per_month)
+
+@traced('paths.simulate')
+def simulate_paths(params, horizon, paths=DEFAULT_PATHS, shock='lognormal', sigma=0.2, regime=None, seed=None, chunk_paths=CHUNK_PATHS, ruin_threshold=0.0):
+    # params: (N, P) 參數陣列；每個情境模擬 paths 條路徑
+    # 現金水位 <= ruin_threshold 即視為破產（資金歸零也算）
+    # 回傳 {'ruin_probability': (N, T), 'expected_shortfall': (N, T)（無破產者為 nan），
+    #       'final_cash_balance_mean': (N,), 'paths': paths}
+    if shock not in ('lognormal', 'regime'):
+        raise ValueError(f"不支援的衝擊模型: {shock}")
+    horizon = as_horizon(horizon)
+    p = unpack_params(params)
+    n, periods, ramp = len(p['rpm']), horizon.periods, horizon.ramp_periods
+    regime = {**REGIME_DEFAULTS, **(regime or {})}
+    p_down = _monthly_probability_per_period(regime['p_down'], horizon)
+    p_recover = _monthly_probability_per_period(regime['p_recover'], horizon)
+    # 衝擊為每月尺度，換算為每期（獨立衝擊的標準差按 √期數 縮放）
+    sigma_period = sigma / np.sqrt(horizon.periods_per_month)
+
+    # 與路徑無關的部分：確定性月成長率、每位用戶每期收入、每期成本（皆為每情境）
+    growth = batch_growth_rates(horizon, p['initial_growth_rate'], p['final_growth_rate'])
+    rate = _column(p['subscription_rate'])
+    revenue_per_user = horizon.per_period(
+        rate * (_column(p['monthly_subscription_price']) + _column(p['annual_subscription_price']) / 12)
+        + (1 - rate) * _column(p['rpm']) / 1000
+    )
+    costs = -batch_cash_flow(np.zeros((n, periods)), p['personnel_cost_low'], p['personnel_cost_high'], p['operational_cost'], horizon)[0]
+
+    rng = np.random.default_rng(seed)
+    ruined = np.zeros((n, periods), dtype=np.int64)
+    shortfall = np.zeros((n, periods))
+    final_sum = np.zeros(n)
+    step = max(1, chunk_paths // n)
+    for start in range(0, paths, step):
+        m = min(step, paths - start)
+        # 每條路徑的狀態（固定大小，與期數無關）
+        mau = np.zeros((n, m))
+        cash = np.broadcast_to(_column(p['initial_capital']), (n, m)).copy()
+        lowest = cash.copy()
+        down = np.zeros((n, m), dtype=bool)
+        for t in range(periods):
+            if t >= ramp:
+                monthly = growth[:, t:t + 1] * np.exp(sigma_period * rng.standard_normal((n, m)) - sigma_period ** 2 / 2)
+                if shock == 'regime':
+                    u = rng.random((n, m))
+                    down = np.where(down, u >= p_recover, u < p_down)
+                    monthly = np.where(down, monthly * regime['down_multiplier'] + regime['down_shift'], monthly)
+                factor = 1 + horizon.growth_rate_per_period(np.maximum(monthly, -0.99))
+                mau = STARTING_MAU * factor if t == ramp else mau * factor
+                cash += mau * revenue_per_user
+            cash -= costs[:, t:t + 1]
+            np.minimum(lowest, cash, out=lowest)
+            below = lowest <= ruin_threshold
+            ruined[:, t] += below.sum(axis=1)
+            shortfall[:, t] += np.where(below, ruin_threshold - lowest, 0).sum(axis=1)
+        final_sum += cash.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        expected_shortfall = np.where(ruined > 0, shortfall / ruined, np.nan)
+    return {
+        'ruin_probability': ruined / paths,
+        'expected_shortfall': expected_shortfall,
+        'final_cash_balance_mean': final_sum / paths,
+        'paths': paths,
+    }
+
+# ============================================
+# 主程式
+# ============================================
+
+def main():
+    from model import MONTHS_TOTAL, scenario_batch
+
+    names, params = scenario_batch()
+    print("\n==================== 隨機成長路徑 ====================")
+    for shock in ('lognormal', 'regime'):
+        results = simulate_paths(params, MONTHS_TOTAL, shock=shock, seed=0)
+        print(f"\n衝擊模型: {shock}（每情境 {results['paths']:,} 條路徑）")
+        for i, name in enumerate(names):
+            print(f"{name} Scenario:  期末平均現金水位 {int(results['final_cash_balance_mean'][i]):,} TWD")
+            for month in (6, 12, 18, 24, 30, 36):
+                probability = results['ruin_probability'][i, month - 1]
+                shortfall = results['expected_shortfall'][i, month - 1]
+                detail = f"，條件平均缺口 {int(shortfall):,} TWD" if probability > 0 else ""
+                print(f"  第 {month:>2} 月前資金用盡機率: {probability:7.2%}{detail}")
+    print("================================================")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# ============================================
+# AFFINITY財務模擬：圖表輸出流程（平行、快取）
+# ============================================
+#
+# 每張圖以「圖表規格」描述：檔名、尺寸與依序執行的繪圖指令(ops)。
+# 規格可序列化、可雜湊，因此能：
+#   1. 分派到多個行程(process)平行繪製，一律使用無視窗的 Agg 後端；
+#   2. 與輸出目錄中的 manifest 比對雜湊值，輸入資料與樣式皆未變更的圖直接略過。
+
+import hashlib
+import json
+import os
+
+from instrument import count, drain, merge, span, traced
+
+# 預設輸出目錄與解析度
+OUTPUT_DIR = os.path.expanduser("~/Downloads/tmp")
+DPI = 300
+MANIFEST_NAME = ".render_manifest.json"
+# 繪圖程式本身變更時調高，讓既有輸出全部失效
+RENDER_VERSION = 1
+
+# ============================================
+# 圖表規格
+# ============================================
+
+def op(name, *args, **kwargs):
+    # 一個繪圖指令：name 為 Axes 方法名稱或下方 SPECIAL_OPS 之一
+    return [name, list(args), kwargs]
+
+def figure_spec(filename, ops, figsize=(10, 8)):
+    return {'filename': filename, 'figsize': list(figsize), 'ops': ops}
+
+def _json_default(value):
+    # numpy 純量與陣列轉為 Python 原生型別
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if isinstance(value, range):
+        return list(value)
+    raise TypeError(f"無法序列化: {type(value).__name__}")
+
+def spec_hash(spec):
+    payload = json.dumps(
+        {'version': RENDER_VERSION, 'dpi': DPI, 'spec': spec},
+        sort_keys=True, default=_json_default, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+# ============================================
+# 標註函式
+# ============================================
+
+@traced('render.annotate_highlight_points')
+def annotate_highlight_points(ax, x_data, y_data, highlight_months, color='red', bbox_props=None):
+    y_min, y_max = min(y_data), max(y_data)
+    offset = (y_max - y_min) * 0.05 if y_max != y_min else 10
+
+    if bbox_props is None:
+        bbox_props = dict(boxstyle="round,pad=0.3", edgecolor=color, facecolor="white")
+
+    for month in highlight_months:
+        value = y_data[month - 1]
+        ax.scatter(month, value, color=color, edgecolor='black', zorder=10, s=100)
+        ax.text(month, value + offset, f"{int(value):,}", ha='center', fontsize=9, color=color, bbox=bbox_props)
+
+def annotate_breakeven(ax, breakeven_month, chart_type, breakeven_data):
+    if breakeven_month and breakeven_data and 'value' in breakeven_data and 'label' in breakeven_data:
+        month = breakeven_data['month']
+        val = breakeven_data['value']
+        label = breakeven_data['label']
+
+        y_min, y_max = ax.get_ylim()
+        offset = (y_max - y_min) * 0.1 if y_max != y_min else 10
+
+        ax.axvline(month, color='green', linestyle='--', linewidth=1.5, label='Breakeven')
+
+        info_text = f"Month: {month}\n{label}: {int(val):,}"
+
+        ax.text(
+            month, val + offset, info_text, color='green', fontsize=10, ha='center',
+            bbox=dict(boxstyle="round,pad=0.3", edgecolor='blue', facecolor="white")
+        )
+    else:
+        ax.text(
+            0.95, 0.95, 'No Breakeven Point in this scenario',
+            transform=ax.transAxes, fontsize=12, color='red', ha='right', va='top',
+            bbox=dict(boxstyle="round,pad=0.3", edgecolor='red', facecolor="white")
+        )
+
+def _figure_text(ax, *args, **kwargs):
+    ax.figure.text(*args, **kwargs)
+
+def _colorbar(ax, **kwargs):
+    # 為最後一個 imshow 加上色條
+    ax.figure.colorbar(ax.images[-1], ax=ax, **kwargs)
+
+SPECIAL_OPS = {
+    'annotate_highlight_points': annotate_highlight_points,
+    'annotate_breakeven': annotate_breakeven,
+    'figure_text': _figure_text,
+    'colorbar': _colorbar,
+}
+
+# ============================================
+# 繪製與儲存
+# ============================================
+
+def _pyplot():
+    # 一律使用無視窗後端，不會觸及任何 GUI
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def save_individual_fig(fig, filename, output_dir=None):
+    output_dir = output_dir or OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    filepath = os.path.join(output_dir, filename)
+    with span('render.savefig', filename=filename):
+        fig.savefig(filepath, dpi=DPI, bbox_inches='tight')
+    _pyplot().close(fig)  # 關閉圖表以節省記憶體
+    return filepath
+
+def draw_figure(spec):
+    plt = _pyplot()
+    with span('render.draw', filename=spec['filename']):
+        fig, ax = plt.subplots(figsize=tuple(spec['figsize']))
+        for name, args, kwargs in spec['ops']:
+            if name in SPECIAL_OPS:
+                SPECIAL_OPS[name](ax, *args, **kwargs)
+            else:
+                getattr(ax, name)(*args, **kwargs)
+    return fig
+
+def _render_job(spec, output_dir):
+    # 於工作行程中執行：繪製並儲存單張圖
+    with span('render.figure', filename=spec['filename']):
+        return save_individual_fig(draw_figure(spec), spec['filename'], output_dir)
+
+def _pool_render_job(spec, output_dir):
+    # 工作行程版本：連同本行程的量測事件一併回傳給主行程合併
+    return _render_job(spec, output_dir), drain()
+
+# ============================================
+# manifest
+# ============================================
+
+def _load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+# ============================================
+# 主流程
+# ============================================
+
+@traced('render.render_figures')
+def render_figures(specs, output_dir=None, workers=None, force=False):
+    # 繪製所有規格；回傳 {'rendered': [...], 'skipped': [...]} 兩份檔案路徑清單
+    output_dir = output_dir or OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = _load_manifest(output_dir)
+
+    pending, skipped = [], []
+    for spec in specs:
+        digest = spec_hash(spec)
+        filepath = os.path.join(output_dir, spec['filename'])
+        if not force and manifest.get(spec['filename']) == digest and os.path.exists(filepath):
+            skipped.append(filepath)
+            count('render.skipped')
+            print(f"圖表未變更，略過: {filepath}")
+        else:
+            pending.append((spec, digest))
+
+    workers = min(workers or os.cpu_count() or 1, len(pending))
+    rendered = []
+    try:
+        if workers <= 1:
+            results = (_render_job(spec, output_dir) for spec, _ in pending)
+            for (spec, digest), filepath in zip(pending, results):
+                manifest[spec['filename']] = digest
+                rendered.append(filepath)
+                print(f"圖表已儲存至: {filepath}")
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_pool_render_job, spec, output_dir) for spec, _ in pending]
+                for (spec, digest), future in zip(pending, futures):
+                    filepath, events = future.result()
+                    merge(events)
+                    manifest[spec['filename']] = digest
+                    rendered.append(filepath)
+                    print(f"圖表已儲存至: {filepath}")
+    finally:
+        count('render.rendered', len(rendered))
+        # 即使中途失敗，已完成的圖仍記錄於 manifest
+        if rendered:
+            _save_manifest(output_dir, manifest)
+    return {'rendered': rendered, 'skipped': skipped}
@@ -0,0 +1,98 @@
+# ============================================
+# AFFINITY財務模擬：欄位式情境結果
+# ============================================
+#
+# 每個欄位（MAU、收入、現金流、現金水位…）各存一個 float64 陣列，
+# 只有在輸出表格時才格式化成字串。繪圖(main.py)與表格(table.py)共用同一物件。
+
+import numpy as np
+
+from engine import breakeven_or_none
+
+# 數值欄位（對應 simulate_batch 的輸出鍵）
+SERIES_COLUMNS = (
+    'mau',
+    'subscription_revenue',
+    'ad_revenue',
+    'monthly_revenue',
+    'cash_flow',
+    'cumulative_surplus',
+    'cash_balance',
+    'growth_rates',
+)
+
+def _twd(value):
+    return f"{int(value):,} TWD"
+
+# 表格欄位：(標題, 欄位, 格式化函式)
+TABLE_COLUMNS = (
+    ('MAU', 'mau', lambda v: f"{int(v):,}"),
+    ('訂閱收入', 'subscription_revenue', _twd),
+    ('廣告收入', 'ad_revenue', _twd),
+    ('總收入', 'monthly_revenue', _twd),
+    ('現金流', 'cash_flow', _twd),
+    ('累積餘額', 'cumulative_surplus', _twd),
+    ('現金水位', 'cash_balance', _twd),
+    ('成長率 (%)', 'growth_rates', lambda v: f"{v * 100:.2f}"),
+)
+
+class ScenarioResult:
+    # 單一情境的欄位式結果；陣列可為批次結果的切片（不複製）
+
+    __slots__ = ('scenario', 'breakeven_month', 'final_cumulative_surplus') + SERIES_COLUMNS
+
+    def __init__(self, scenario, breakeven_month, **series):
+        self.scenario = scenario
+        self.breakeven_month = breakeven_month
+        for name in SERIES_COLUMNS:
+            setattr(self, name, series[name])
+        self.final_cumulative_surplus = float(self.cumulative_surplus[-1]) if len(self.cumulative_surplus) else 0
+
+    def __len__(self):
+        return len(self.mau)
+
+    @property
+    def months(self):
+        return np.arange(1, len(self) + 1)
+
+    @property
+    def total_revenue(self):
+        return self.subscription_revenue + self.ad_revenue
+
+    @property
+    def growth_rates_percent(self):
+        return self.growth_rates * 100
+
+    def formatted_rows(self):
+        # 逐列產生格式化後的表格資料（僅在輸出時呼叫）
+        for i in range(len(self)):
+            row = {'月份': i + 1}
+            for header, name, fmt in TABLE_COLUMNS:
+                row[header] = fmt(getattr(self, name)[i])
+            yield row
+
+def results_from_batch(names, results):
+    # 將 simulate_batch 的 (N, T) 輸出切成 N 個 ScenarioResult（共用同一份陣列）
+    breakeven = results['breakeven_month']
+    return [
+        ScenarioResult(
+            name,
+            breakeven_or_none(breakeven[i]),
+            **{column: results[column][i] for column in SERIES_COLUMNS}
+        )
+        for i, name in enumerate(names)
+    ]
+
+def print_summary(summaries):
+    # summaries: [(情境名稱, 損益平衡月份或 None, 最終累積餘額), ...]
+    print("\n==================== 財務摘要 ====================")
+    for i, (name, breakeven_month, final_cumulative_surplus) in enumerate(summaries):
+        if i:
+            print()
+        print(f"{name} Scenario:")
+        if breakeven_month:
+            print(f"  有損益平衡點，於第 {breakeven_month} 月達成。")
+        else:
+            print("  無法在預設期間內達到損益平衡。")
+        print(f"  最終累積餘額: {int(final_cumulative_surplus):,} TWD")
+    print("================================================")
@@ -0,0 +1,341 @@
+# ============================================
+# AFFINITY財務模擬：宣告式情境檔（TOML / JSON / JSONL）
+# ============================================
+#
+# 情境定義不再寫死於程式中，而是由檔案載入：
+#   - TOML / JSON：{"settings": {...}, "scenarios": {鍵: 定義}}，見 scenarios.toml
+#   - JSONL：每行一個情境定義，另以 "id" 命名；適合大量情境，逐行串流解析
+# 每個定義可用 extends 繼承另一情境，scale 對繼承值乘上倍數，其餘參數鍵（或 overrides）直接覆寫。
+# JSONL 的 extends 只能指向前面已出現的行，解析時不需回頭讀檔。
+# 所有情境先組成 (N, P) 參數陣列，再以整欄運算一次驗證（缺少參數為 nan，一併檢出）。
+# load_params 將編譯後的陣列快取於來源檔旁（<來源>.cache.npz），
+# 來源檔的修改時間或大小改變時才重新解析。
+#   python scenarios.py scenarios.toml
+#   python scenarios.py many.jsonl --store results/ --export many.csv
+
+import argparse
+import json
+import os
+import sys
+import time
+import tomllib
+
+import numpy as np
+
+from engine import PARAM_INDEX, PARAM_NAMES
+from instrument import traced
+
+# 預設情境檔，可由環境變數 AFFINITY_SCENARIOS 指定其他檔案
+SCENARIO_FILE = os.environ.get('AFFINITY_SCENARIOS') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenarios.toml')
+SETTINGS_DEFAULTS = {'months_total': 36, 'highlight_months': []}
+# 參數以外的定義欄位
+ENTRY_KEYS = frozenset(('id', 'name', 'extends', 'scale', 'overrides'))
+CACHE_SUFFIX = '.cache.npz'
+# 快取格式變更時遞增，使舊快取失效
+CACHE_VERSION = 1
+# JSONL 每累積此列數即轉為陣列，避免大量 Python 串列常駐記憶體
+CHUNK_ROWS = 2 ** 16
+
+# 各參數的有效範圍：(整欄檢查, 說明)；另一律需為有限數值
+PARAM_RULES = {
+    'initial_growth_rate': (lambda v: v > 0, "需大於 0"),
+    'final_growth_rate': (lambda v: v > 0, "需大於 0"),
+    'monthly_subscription_price': (lambda v: v >= 0, "不可為負"),
+    'annual_subscription_price': (lambda v: v >= 0, "不可為負"),
+    'subscription_rate': (lambda v: (v >= 0) & (v <= 1), "需介於 0 與 1"),
+    'rpm': (lambda v: v >= 0, "不可為負"),
+    'personnel_cost_low': (lambda v: v >= 0, "不可為負"),
+    'personnel_cost_high': (lambda v: v >= 0, "不可為負"),
+    'operational_cost': (lambda v: v >= 0, "不可為負"),
+    'initial_capital': (lambda v: np.ones(len(v), dtype=bool), "需為有限數值"),
+}
+
+class ScenarioError(ValueError):
+    pass
+
+# ============================================
+# 單一定義的解析（繼承、倍數、覆寫）
+# ============================================
+
+def _check_number(value, name, where):
+    if type(value) not in (int, float):
+        raise ScenarioError(f"{where}: {name} 需為數值，收到 {value!r}")
+
+def _resolve_entry(entry, parent, where):
+    # entry: 情境定義；parent: 繼承的參數列（依 PARAM_NAMES，缺少者為 nan）或 None
+    # 回傳新的參數列；先對繼承值套用 scale，再以參數鍵與 overrides 覆寫
+    if type(entry) is not dict:
+        raise ScenarioError(f"{where}: 情境定義需為物件/表格")
+    row = list(parent) if parent is not None else [np.nan] * len(PARAM_NAMES)
+    scale = entry.get('scale')
+    if scale is not None and not isinstance(scale, dict):
+        raise ScenarioError(f"{where}: scale 需為表格")
+    overrides = entry.get('overrides')
+    if overrides is not None and not isinstance(overrides, dict):
+        raise ScenarioError(f"{where}: overrides 需為表格")
+    if scale:
+        if parent is None:
+            raise ScenarioError(f"{where}: scale 需搭配 extends")
+        for name, factor in scale.items():
+            i = PARAM_INDEX.get(name)
+            if i is None:
+                raise ScenarioError(f"{where}: 未知欄位: scale.{name}")
+            _check_number(factor, f"scale.{name}", where)
+            if row[i] != row[i]:
+                raise ScenarioError(f"{where}: 繼承的情境沒有參數 {name}，無法套用 scale")
+            row[i] = row[i] * factor
+    for source, prefix in ((entry, ''), (overrides or {}, 'overrides.')):
+        for name, value in source.items():
+            i = PARAM_INDEX.get(name)
+            if i is None:
+                if prefix or name not in ENTRY_KEYS:
+                    raise ScenarioError(f"{where}: 未知欄位: {prefix}{name}")
+                continue
+            _check_number(value, prefix + name, where)
+            row[i] = value
+    return row
+
+def _resolve_definitions(definitions, where):
+    # {鍵: 定義} → {鍵: 參數列}，依定義順序；extends 可指向檔案中任何情境
+    resolved = {}
+
+    def resolve(key, chain):
+        if key in resolved:
+            return resolved[key]
+        if key in chain:
+            raise ScenarioError(f"{where}: 循環繼承: {' → '.join(chain + (key,))}")
+        if key not in definitions:
+            raise ScenarioError(f"{where} [{chain[-1]}]: extends 的情境 {key!r} 不存在")
+        entry = definitions[key]
+        parent = resolve(entry['extends'], chain + (key,)) if isinstance(entry, dict) and 'extends' in entry else None
+        resolved[key] = _resolve_entry(entry, parent, f"{where} [{key}]")
+        return resolved[key]
+
+    for key in definitions:
+        resolve(key, ())
+    return resolved
+
+# ============================================
+# 整批驗證
+# ============================================
+
+def validate_params(params, ids=None, max_examples=3):
+    # params: (N, P) 參數陣列，缺少的參數為 nan；有任何問題時引發 ScenarioError 並列出所有問題欄位
+    ids = np.arange(len(params)) if ids is None else np.asarray(ids)
+    problems = []
+    for i, name in enumerate(PARAM_NAMES):
+        column = params[:, i]
+        missing = np.isnan(column)
+        check, message = PARAM_RULES[name]
+        with np.errstate(invalid='ignore'):
+            invalid = ~missing & ~(np.isfinite(column) & check(column))
+        for mask, text in ((missing, "缺少"), (invalid, message)):
+            count = int(np.count_nonzero(mask))
+            if count:
+                examples = ', '.join(str(key) for key in ids[np.flatnonzero(mask)[:max_examples]])
+                problems.append(f"  {name} {text}: {count:,} 個情境（例如 {examples}）")
+    if problems:
+        raise ScenarioError("情境驗證失敗:\n" + "\n".join(problems))
+
+def _rows(resolved):
+    return np.array(list(resolved.values()), dtype=float).reshape(-1, len(PARAM_NAMES))
+
+# ============================================
+# 檔案載入
+# ============================================
+
+def read_document(path):
+    # TOML / JSON 文件 → dict
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension == '.toml':
+            with open(path, 'rb') as f:
+                return tomllib.load(f)
+        if extension == '.json':
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+    except (tomllib.TOMLDecodeError, json.JSONDecodeError) as e:
+        raise ScenarioError(f"{path}: 格式錯誤: {e}") from e
+    raise ScenarioError(f"不支援的情境檔格式: {path}（可用: .toml、.json、.jsonl）")
+
+def load_scenarios(path=SCENARIO_FILE):
+    # TOML / JSON 情境檔 → {'settings': {...}, 'scenarios': {鍵: {'name': 顯示名稱, 'params': {參數: 值}}}}
+    # 參數保留檔案中的型別（整數不轉為浮點數），依 PARAM_NAMES 排序
+    document = read_document(path)
+    definitions = document.get('scenarios') or {}
+    if not definitions:
+        raise ScenarioError(f"{path}: 沒有任何情境")
+    resolved = _resolve_definitions(definitions, path)
+    validate_params(_rows(resolved), list(resolved))
+    return {
+        'settings': {**SETTINGS_DEFAULTS, **document.get('settings', {})},
+        'scenarios': {
+            key: {
+                'name': definitions[key].get('name', key),
+                'params': dict(zip(PARAM_NAMES, row)),
+            }
+            for key, row in resolved.items()
+        },
+    }
+
+def _compile_jsonl(path):
+    # 逐行解析 JSONL；每 CHUNK_ROWS 列轉為一個陣列區塊
+    ids, index, chunks, pending = [], {}, [], []
+    # 已轉為陣列的列中被繼承者，轉回串列後保留（通常只有少數幾個基準情境）
+    parents = {}
+
+    def row_of(i):
+        flushed = len(chunks) * CHUNK_ROWS
+        if i >= flushed:
+            return pending[i - flushed]
+        if i not in parents:
+            parents[i] = chunks[i // CHUNK_ROWS][i % CHUNK_ROWS].tolist()
+        return parents[i]
+
+    with open(path, encoding='utf-8') as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            where = f"{path}:{lineno}"
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ScenarioError(f"{where}: JSON 格式錯誤: {e}") from e
+            parent = None
+            if type(entry) is dict and 'extends' in entry:
+                j = index.get(str(entry['extends']))
+                if j is None:
+                    raise ScenarioError(f"{where}: extends 的情境 {entry['extends']!r} 需先於此行定義")
+                parent = row_of(j)
+            row = _resolve_entry(entry, parent, where)
+            key = str(entry.get('id', len(ids)))
+            if key in index:
+                raise ScenarioError(f"{where}: 重複的情境 id {key!r}")
+            index[key] = len(ids)
+            ids.append(key)
+            pending.append(row)
+            if len(pending) == CHUNK_ROWS:
+                chunks.append(np.array(pending, dtype=float))
+                pending = []
+    if pending or not chunks:
+        chunks.append(np.array(pending, dtype=float).reshape(-1, len(PARAM_NAMES)))
+    return np.array(ids, dtype=str), np.concatenate(chunks)
+
+@traced('scenarios.compile')
+def compile_params(path):
+    # 任一格式的情境檔 → (ids, (N, P) 參數陣列)，並整批驗證
+    if path.lower().endswith('.jsonl'):
+        ids, params = _compile_jsonl(path)
+    else:
+        resolved = _resolve_definitions(read_document(path).get('scenarios') or {}, path)
+        ids, params = np.array(list(resolved), dtype=str), _rows(resolved)
+    if not len(ids):
+        raise ScenarioError(f"{path}: 沒有任何情境")
+    validate_params(params, ids)
+    return ids, params
+
+# ============================================
+# 編譯快取
+# ============================================
+
+def cache_path(path):
+    return path + CACHE_SUFFIX
+
+def _source_stamp(path):
+    # 來源檔的修改時間、大小與快取格式版本，任一不同即視為失效
+    stat = os.stat(path)
+    return np.array([stat.st_mtime_ns, stat.st_size, CACHE_VERSION], dtype=np.int64)
+
+def _read_cache(path, stamp):
+    try:
+        with np.load(cache_path(path)) as data:
+            if np.array_equal(data['stamp'], stamp):
+                return data['ids'], data['params']
+    except (OSError, ValueError, KeyError):
+        pass  # 不存在或損壞的快取視同失效
+    return None
+
+def _write_cache(path, stamp, ids, params):
+    # 先寫暫存檔再置換；來源目錄不可寫入時略過快取
+    tmp_path = f"{cache_path(path)}.{os.getpid()}.tmp.npz"
+    try:
+        np.savez(tmp_path, stamp=stamp, ids=ids, params=params)
+        os.replace(tmp_path, cache_path(path))
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+def load_params(path, cache=True):
+    # 情境檔 → (ids, (N, P) 參數陣列)；cache=True 時優先使用未失效的編譯快取
+    stamp = _source_stamp(path)
+    if cache:
+        cached = _read_cache(path, stamp)
+        if cached is not None:
+            return cached
+    ids, params = compile_params(path)
+    if cache:
+        _write_cache(path, stamp, ids, params)
+    return ids, params
+
+# ============================================
+# 主程式
+# ============================================
+
+def main(argv=None):
+    from engine import as_horizon, chunk_rows, summarize_batch, unpack_params
+
+    parser = argparse.ArgumentParser(description="AFFINITY 情境檔：載入、驗證並批次模擬")
+    parser.add_argument('file', nargs='?', default=SCENARIO_FILE, help="情境檔（.toml / .json / .jsonl）")
+    parser.add_argument('--months', type=int, help="模擬月數（預設為情境檔 settings.months_total 或 36）")
+    parser.add_argument('--no-cache', action='store_true', help="不讀寫編譯快取")
+    parser.add_argument('--store', help="將參數與摘要指標寫入結果庫目錄（store.py）")
+    parser.add_argument('--export', help="串流匯出逐月序列至此檔案（.csv / .jsonl / .parquet）")
+    parser.add_argument('--top', type=int, default=5, help="列出最早達成損益平衡的情境數")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        ids, params = load_params(args.file, cache=not args.no_cache)
+    except ScenarioError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"已載入 {len(ids):,} 個情境（{time.perf_counter() - started:.2f} 秒）")
+
+    months = args.months
+    if months is None:
+        months = SETTINGS_DEFAULTS['months_total']
+        if not args.file.lower().endswith('.jsonl'):
+            months = read_document(args.file).get('settings', {}).get('months_total', months)
+    horizon = as_horizon(months)
+
+    writer = None
+    if args.store:
+        from store import StoreWriter
+        writer = StoreWriter(args.store, len(params))
+    breakeven = np.empty(len(params), dtype=np.int64)
+    surplus = np.empty(len(params))
+    chunk = chunk_rows(horizon)
+    for start in range(0, len(params), chunk):
+        block = params[start:start + chunk]
+        metrics = summarize_batch(block, horizon)
+        breakeven[start:start + len(block)] = metrics['breakeven_month']
+        surplus[start:start + len(block)] = metrics['final_cumulative_surplus']
+        if writer:
+            writer.append({**unpack_params(block), **metrics})
+    if writer:
+        writer.close()
+        print(f"結果庫已儲存至: {args.store}")
+    if args.export:
+        from export import batches_from_params, export
+        rows = export(batches_from_params(params, horizon, names=ids), args.export)
+        print(f"已匯出 {rows:,} 列至: {args.export}")
+
+    reached = breakeven > 0
+    print(f"達成損益平衡: {int(reached.sum()):,} / {len(ids):,} 個情境")
+    order = np.flatnonzero(reached)[np.argsort(breakeven[reached], kind='stable')][:args.top]
+    for i in order:
+        print(f"  {ids[i]}: 第 {breakeven[i]} 月達成，最終累積餘額 {int(surplus[i]):,} TWD")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+# ============================================
+# AFFINITY財務模擬：敏感度分析（龍捲風圖、彈性、Sobol 指數）
+# ============================================
+#
+# 所有擾動情境組成一個參數陣列，一次送入批次引擎：
+#   - 單因子(one-at-a-time)：每個參數 ±delta，以中央差分求彈性 (Δy/y) / (Δx/x)
+#   - 兩兩交互：每對參數的 (+,+) (+,-) (-,+) (-,-) 四個角，求交互作用項
+#   - 全域 Sobol 指數：Saltelli 取樣（A、B 與 k 個 AB_i 矩陣，共 n(k+2) 個情境），
+#     一階指數用 Saltelli (2010) 估計式，總效應指數用 Jansen 估計式
+# 未達損益平衡的情境，其損益平衡月份以「期數 + 1」計（設限值），讓指標保持有限。
+
+import itertools
+
+import numpy as np
+
+from engine import PARAM_INDEX, PARAM_NAMES, as_horizon, batch_metrics, chunk_rows, pack_params, simulate_batch
+from instrument import traced
+from render import figure_spec, op
+
+DEFAULT_DELTA = 0.10
+OUTPUTS = ('final_cumulative_surplus', 'breakeven_month', 'min_cash_balance')
+
+def _evaluate(params, horizon):
+    # 回傳 {指標: (N,) 陣列}；未達損益平衡者取 periods + 1
+    horizon = as_horizon(horizon)
+    metrics = batch_metrics(simulate_batch(params, horizon))
+    breakeven = metrics['breakeven_month'].astype(float)
+    outputs = dict(metrics)
+    outputs['breakeven_month'] = np.where(breakeven > 0, breakeven, horizon.periods + 1)
+    return {name: outputs[name] for name in OUTPUTS}
+
+# ============================================
+# 局部敏感度（單因子與兩兩交互）
+# ============================================
+
+@traced('sensitivity.local')
+def local_sensitivity(base, horizon, delta=DEFAULT_DELTA, params=PARAM_NAMES, pairs=True):
+    # base: {參數: 基準值}；所有擾動一次批次計算
+    # 回傳 {
+    #   'base': {指標: 值},
+    #   'low' / 'high': {指標: {參數: 值}}（參數 × (1 ∓ delta)）,
+    #   'elasticity': {指標: {參數: 彈性}},
+    #   'interaction': {指標: {(參數1, 參數2): 相對交互作用}}（pairs=True 時）
+    # }
+    params = list(params)
+    base_row = np.array([float(base[name]) for name in PARAM_NAMES])
+    rows = [base_row]
+    for name in params:
+        for sign in (-1, 1):
+            row = base_row.copy()
+            row[PARAM_INDEX[name]] *= 1 + sign * delta
+            rows.append(row)
+    pair_list = list(itertools.combinations(params, 2)) if pairs else []
+    for a, b in pair_list:
+        for sa, sb in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+            row = base_row.copy()
+            row[PARAM_INDEX[a]] *= 1 + sa * delta
+            row[PARAM_INDEX[b]] *= 1 + sb * delta
+            rows.append(row)
+    outputs = _evaluate(np.array(rows), horizon)
+
+    result = {'base': {}, 'low': {}, 'high': {}, 'elasticity': {}, 'interaction': {}}
+    k = len(params)
+    for metric, values in outputs.items():
+        y0 = values[0]
+        low, high = values[1:1 + 2 * k:2], values[2:2 + 2 * k:2]
+        result['base'][metric] = float(y0)
+        result['low'][metric] = dict(zip(params, low.tolist()))
+        result['high'][metric] = dict(zip(params, high.tolist()))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            elasticity = (high - low) / (2 * delta * y0)
+        result['elasticity'][metric] = dict(zip(params, elasticity.tolist()))
+        if pair_list:
+            corners = values[1 + 2 * k:].reshape(-1, 4)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                interaction = (corners[:, 0] - corners[:, 1] - corners[:, 2] + corners[:, 3]) / (4 * delta ** 2 * y0)
+            result['interaction'][metric] = dict(zip(pair_list, interaction.tolist()))
+    return result
+
+def tornado_spec(filename, sensitivity, metric='final_cumulative_surplus', label=None, top=None):
+    # 龍捲風圖：每個參數一條橫條，從 -delta 的結果延伸到 +delta 的結果，依擺幅由大到小排列
+    base = sensitivity['base'][metric]
+    low, high = sensitivity['low'][metric], sensitivity['high'][metric]
+    names = sorted(low, key=lambda name: abs(high[name] - low[name]))
+    if top:
+        names = names[-top:]
+    positions = list(range(len(names)))
+    label = label or metric
+    return figure_spec(filename, [
+        op('barh', positions, [low[name] - base for name in names], left=base, color='#E53935', alpha=0.8, label='Parameter −δ'),
+        op('barh', positions, [high[name] - base for name in names], left=base, color='#1E88E5', alpha=0.8, label='Parameter +δ'),
+        op('axvline', base, color='black', linewidth=1),
+        op('set_yticks', positions),
+        op('set_yticklabels', names),
+        op('set_xlabel', label),
+        op('set_title', f'Sensitivity of {label}', fontweight='bold'),
+        op('grid', axis='x', linestyle='--', alpha=0.7),
+        op('legend', loc='lower right'),
+    ])
+
+# ============================================
+# 全域敏感度（Sobol 指數）
+# ============================================
+
+@traced('sensitivity.sobol')
+def sobol_indices(base, horizon, n=4096, spread=0.2, params=PARAM_NAMES, bounds=None, seed=None):
+    # 每個參數在 base × (1 ± spread)（或 bounds[參數] = (low, high)）內均勻分布
+    # 回傳 {指標: {'first_order': {參數: S_i}, 'total': {參數: ST_i}}}，以及 'evaluations'
+    horizon = as_horizon(horizon)
+    params = list(params)
+    bounds = dict(bounds or {})
+    k = len(params)
+    ranges = np.array([bounds.get(name, (base[name] * (1 - spread), base[name] * (1 + spread))) for name in params], dtype=float)
+    low, high = ranges[:, 0], ranges[:, 1]
+    rng = np.random.default_rng(seed)
+    a = low + (high - low) * rng.random((n, k))
+    b = low + (high - low) * rng.random((n, k))
+
+    def params_for(x):
+        columns = {name: base[name] for name in PARAM_NAMES}
+        columns.update({name: x[:, i] for i, name in enumerate(params)})
+        return pack_params(**columns)
+
+    # A、B、AB_1..AB_k 疊成一個參數陣列，分批模擬
+    blocks = [a, b]
+    for i in range(k):
+        ab = a.copy()
+        ab[:, i] = b[:, i]
+        blocks.append(ab)
+    stacked = params_for(np.concatenate(blocks))
+    outputs = {name: np.empty(len(stacked)) for name in OUTPUTS}
+    rows = chunk_rows(horizon)
+    for start in range(0, len(stacked), rows):
+        chunk = _evaluate(stacked[start:start + rows], horizon)
+        for name in OUTPUTS:
+            outputs[name][start:start + rows] = chunk[name]
+
+    result = {'evaluations': len(stacked)}
+    for metric, values in outputs.items():
+        f = values.reshape(k + 2, n)
+        fa, fb, fab = f[0], f[1], f[2:]
+        variance = np.var(np.concatenate([fa, fb]))
+        if variance == 0:
+            first = total = np.zeros(k)
+        else:
+            first = np.mean(fb * (fab - fa), axis=1) / variance
+            total = 0.5 * np.mean((fa - fab) ** 2, axis=1) / variance
+        result[metric] = {
+            'first_order': dict(zip(params, first.tolist())),
+            'total': dict(zip(params, total.tolist())),
+        }
+    return result
+
+# ============================================
+# 主程式
+# ============================================
+
+def main():
+    from model import MONTHS_TOTAL, scenario_params
+    from render import render_figures
+
+    sensitivity = local_sensitivity(scenario_params(), MONTHS_TOTAL)
+    elasticity = sensitivity['elasticity']
+
+    print("\n==================== 敏感度分析（±10%）====================")
+    print(f"{'參數':<28}{'最終累積餘額彈性':>14}{'損益平衡月份彈性':>14}{'最低現金彈性':>12}")
+    for name in sorted(PARAM_NAMES, key=lambda name: -abs(elasticity['breakeven_month'][name])):
+        print(
+            f"{name:<30}{elasticity['final_cumulative_surplus'][name]:>16.3f}"
+            f"{elasticity['breakeven_month'][name]:>16.3f}{elasticity['min_cash_balance'][name]:>14.3f}"
+        )
+    interaction = sensitivity['interaction']['final_cumulative_surplus']
+    strongest = sorted(interaction, key=lambda pair: -abs(interaction[pair]))[:3]
+    print("最強的兩兩交互作用（最終累積餘額）: " + "，".join(f"{a} × {b}: {interaction[(a, b)]:.3f}" for a, b in strongest))
+
+    sobol = sobol_indices(scenario_params(), MONTHS_TOTAL, seed=0)
+    print(f"\nSobol 指數（各參數 ±20% 均勻分布，{sobol['evaluations']:,} 次情境評估）")
+    print(f"{'參數':<28}{'損益平衡 S1':>10}{'損益平衡 ST':>10}{'餘額 S1':>10}{'餘額 ST':>10}")
+    indices = sobol['breakeven_month']
+    surplus = sobol['final_cumulative_surplus']
+    for name in sorted(PARAM_NAMES, key=lambda name: -indices['total'][name]):
+        print(
+            f"{name:<30}{indices['first_order'][name]:>12.3f}{indices['total'][name]:>12.3f}"
+            f"{surplus['first_order'][name]:>12.3f}{surplus['total'][name]:>12.3f}"
+        )
+    print("================================================")
+
+    render_figures([
+        tornado_spec("tornado_final_cumulative_surplus.png", sensitivity, 'final_cumulative_surplus', 'Final Cumulative Surplus (TWD)'),
+        tornado_spec("tornado_breakeven_month.png", sensitivity, 'breakeven_month', 'Breakeven Month'),
+    ])
+
+if __name__ == "__main__":
+    main()
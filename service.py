@@ -0,0 +1,290 @@
+# ============================================
+# AFFINITY財務模擬：本機 what-if 服務（asyncio HTTP/JSON）
+# ============================================
+#
+# 供內部儀表板查詢情境，完全離線、只使用標準函式庫與 numpy。
+#   POST /scenario  內容為 JSON 參數（未提供者取 --scenario 指定情境的值，預設為基準情境），
+#                   可加 "months_total" 與 "series": false（只回傳摘要指標）
+#   GET  /health
+# 數毫秒內同時抵達的請求會合併成一次批次引擎運算；回應依參數雜湊快取（總量以 CACHE_BYTES 為上限）。
+# 參數超出有效範圍（scenarios.PARAM_RULES，例如成長率需大於 0）時回應 400。
+# 回應為嚴格 JSON：永不用盡的資金跑道為 "runway_months": "infinite"，無定義的數值為 null。
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from engine import PARAM_NAMES, batch_metrics, simulate_batch
+from model import MONTHS_TOTAL, scenario_params
+from scenarios import PARAM_RULES
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# 合併請求的等待時間與單批上限
+BATCH_WINDOW = 0.002
+MAX_BATCH = 4096
+# 快取以回應位元組數計：含完整序列的長期間回應可達數百 KB，以筆數設限無法約束記憶體
+CACHE_BYTES = 256 * 2 ** 20
+MAX_MONTHS = 3650
+
+SERIES_KEYS = ('mau', 'subscription_revenue', 'ad_revenue', 'monthly_revenue', 'cash_flow', 'cumulative_surplus', 'cash_balance')
+
+class RequestError(Exception):
+    pass
+
+# ============================================
+# 請求解析與快取鍵
+# ============================================
+
+def parse_query(payload, base=None):
+    # base: 未提供之參數的預設值（預設為基準情境）；回傳 (參數 tuple, months_total, 是否包含序列)
+    base = scenario_params() if base is None else base
+    if not isinstance(payload, dict):
+        raise RequestError("請求內容需為 JSON 物件")
+    unknown = set(payload) - set(PARAM_NAMES) - {'months_total', 'series'}
+    if unknown:
+        raise RequestError(f"未知參數: {', '.join(sorted(unknown))}")
+    # JSON 布林值雖可轉為 1.0 / 0.0，但不是有效的參數值
+    given = [payload[name] for name in PARAM_NAMES if name in payload]
+    if any(isinstance(value, bool) for value in given):
+        raise RequestError("參數需為數值，不接受布林值")
+    try:
+        values = tuple(float(payload.get(name, base[name])) for name in PARAM_NAMES)
+    except (TypeError, ValueError):
+        raise RequestError("參數需為數值")
+    # 不以 int() 轉換：36.9 會被默默截斷為 36；bool 雖是 int 的子類別也不接受
+    months_total = payload.get('months_total', MONTHS_TOTAL)
+    if isinstance(months_total, bool) or not isinstance(months_total, int):
+        raise RequestError("months_total 需為整數")
+    # 不以 bool() 轉換：字串 "false" 會變成 True
+    include_series = payload.get('series', True)
+    if not isinstance(include_series, bool):
+        raise RequestError("series 需為 JSON 布林值 true 或 false")
+    if not all(math.isfinite(v) for v in values):
+        raise RequestError("參數需為有限數值")
+    for name, value in zip(PARAM_NAMES, values):
+        check, message = PARAM_RULES[name]
+        if not check(np.array([value]))[0]:
+            raise RequestError(f"{name} {message}")
+    if not 4 <= months_total <= MAX_MONTHS:
+        raise RequestError(f"months_total 需介於 4 與 {MAX_MONTHS} 之間")
+    return values, months_total, include_series
+
+def param_hash(values, months_total, include_series):
+    raw = json.dumps([values, months_total, include_series]).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()
+
+def _json_number(value):
+    # inf / nan 不是合法 JSON：±inf 以 "infinite" / "-infinite" 表示，nan（無定義）以 null 表示
+    value = float(value)
+    if math.isnan(value):
+        return None
+    if math.isinf(value):
+        return "infinite" if value > 0 else "-infinite"
+    return value
+
+def _month_or_none(value):
+    return int(value) if value > 0 else None
+
+# ============================================
+# 批次合併
+# ============================================
+
+class ScenarioBatcher:
+    # 收集視窗內的查詢，依月數分組後一次送入批次引擎
+
+    def __init__(self, window=BATCH_WINDOW, max_batch=MAX_BATCH, cache_bytes=CACHE_BYTES):
+        self.window = window
+        self.max_batch = max_batch
+        self.cache_bytes = cache_bytes
+        self.cache = OrderedDict()
+        self.cached_bytes = 0
+        self.inflight = {}
+        self.queue = []
+        self.flush_handle = None
+        self.stats = {'requests': 0, 'cache_hits': 0, 'batches': 0, 'scenarios': 0}
+
+    async def query(self, values, months_total, include_series):
+        self.stats['requests'] += 1
+        key = param_hash(values, months_total, include_series)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.move_to_end(key)
+            self.stats['cache_hits'] += 1
+            return cached
+        # 相同參數已在佇列中時共用同一個結果
+        future = self.inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.inflight[key] = future
+            self.queue.append((key, values, months_total, include_series, future))
+            if len(self.queue) >= self.max_batch:
+                self._flush()
+            elif self.flush_handle is None:
+                self.flush_handle = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        queue, self.queue = self.queue, []
+        groups = {}
+        for item in queue:
+            groups.setdefault(item[2], []).append(item)
+        for months_total, items in groups.items():
+            try:
+                bodies = self._evaluate(months_total, items)
+            except Exception as exc:  # 整批失敗時逐一回報錯誤
+                for key, *_, future in items:
+                    self.inflight.pop(key, None)
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (key, *_, future), body in zip(items, bodies):
+                self.inflight.pop(key, None)
+                self._store(key, body)
+                if not future.done():
+                    future.set_result(body)
+
+    def _store(self, key, body):
+        # 單筆超過上限者不快取；其餘依最久未使用的順序淘汰至總量不超過 cache_bytes
+        if len(body) > self.cache_bytes:
+            return
+        previous = self.cache.pop(key, None)
+        if previous is not None:
+            self.cached_bytes -= len(previous)
+        self.cache[key] = body
+        self.cached_bytes += len(body)
+        while self.cached_bytes > self.cache_bytes:
+            _, evicted = self.cache.popitem(last=False)
+            self.cached_bytes -= len(evicted)
+
+    def _evaluate(self, months_total, items):
+        params = np.array([values for _, values, *_ in items])
+        results = simulate_batch(params, months_total)
+        metrics = batch_metrics(results)
+        self.stats['batches'] += 1
+        self.stats['scenarios'] += len(items)
+
+        bodies = []
+        for i, (_, values, _, include_series, _) in enumerate(items):
+            response = {
+                'params': dict(zip(PARAM_NAMES, values)),
+                'months_total': months_total,
+                'metrics': {
+                    'breakeven_month': _month_or_none(metrics['breakeven_month'][i]),
+                    'final_cumulative_surplus': _json_number(metrics['final_cumulative_surplus'][i]),
+                    'cash_out_month': _month_or_none(metrics['cash_out_month'][i]),
+                    'min_cash_balance': _json_number(metrics['min_cash_balance'][i]),
+                    'min_cash_month': int(metrics['min_cash_month'][i]),
+                    'runway_months': _json_number(metrics['runway_months'][i]),
+                },
+            }
+            if include_series:
+                response['series'] = {name: results[name][i].tolist() for name in SERIES_KEYS}
+            bodies.append(json.dumps(response, ensure_ascii=False, allow_nan=False).encode('utf-8'))
+        return bodies
+
+# ============================================
+# HTTP
+# ============================================
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+def _response(status, body, keep_alive):
+    headers = (
+        f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return headers.encode('ascii') + body
+
+def _error(status, message, keep_alive):
+    return _response(status, json.dumps({'error': message}, ensure_ascii=False).encode('utf-8'), keep_alive)
+
+async def _read_request(reader):
+    # 回傳 (method, path, headers, body)；連線關閉時回傳 None
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    lines = head.decode('latin-1').split("\r\n")
+    method, path, _ = lines[0].split(" ", 2)
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+def make_handler(batcher, base=None):
+    async def handle(reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                if path == '/health':
+                    response = _response(200, json.dumps(batcher.stats).encode('utf-8'), keep_alive)
+                elif path != '/scenario':
+                    response = _error(404, "找不到路徑", keep_alive)
+                elif method != 'POST':
+                    response = _error(405, "請使用 POST", keep_alive)
+                else:
+                    try:
+                        values, months_total, include_series = parse_query(json.loads(body or b"{}"), base)
+                        response = _response(200, await batcher.query(values, months_total, include_series), keep_alive)
+                    except (RequestError, ValueError) as exc:
+                        response = _error(400, str(exc), keep_alive)
+                    except Exception as exc:
+                        response = _error(500, str(exc), keep_alive)
+                writer.write(response)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+    return handle
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, window=BATCH_WINDOW, scenario=None):
+    batcher = ScenarioBatcher(window=window)
+    server = await asyncio.start_server(make_handler(batcher, scenario_params(scenario)), host, port)
+    print(f"what-if 服務啟動於 http://{host}:{port}/scenario")
+    async with server:
+        await server.serve_forever()
+
+# ============================================
+# 主程式
+# ============================================
+
+def main():
+    parser = argparse.ArgumentParser(description="AFFINITY 本機 what-if 服務")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--window-ms', type=float, default=BATCH_WINDOW * 1000, help="合併請求的等待時間（毫秒）")
+    parser.add_argument('--scenario', help="未提供之參數的預設情境（情境檔中的鍵，預設為基準情境）")
+    args = parser.parse_args()
+    try:
+        scenario_params(args.scenario)  # 先檢查情境鍵，錯誤時於啟動前結束
+    except KeyError as e:
+        parser.error(e.args[0])
+    try:
+        asyncio.run(serve(args.host, args.port, args.window_ms / 1000, args.scenario))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# ============================================
+# AFFINITY財務模擬：損益平衡目標反推（goal-seek）
+# ============================================
+#
+# 例如「第 18 個月前損益平衡所需的最低訂閱率」或「現金水位不跌破 0 所需的最低初始資金」。
+# 先擴張區間確保目標被夾住，再以向量化二分法同時求解整批參數格點，
+# 每一輪只需對整批情境呼叫一次批次引擎。
+
+import itertools
+
+import numpy as np
+
+from engine import PARAM_NAMES, as_horizon, pack_params, simulate_batch
+
+# ============================================
+# 目標條件（回傳 margin，>= 0 代表達成）
+# ============================================
+
+def breakeven_by(month):
+    # 第 month 個月(含)以前累積餘額曾 >= 0
+    def margin(results):
+        return results['cumulative_surplus'][:, :month].max(axis=1)
+    return margin
+
+def cash_balance_floor(floor=0):
+    # 整段期間現金水位都不低於 floor
+    def margin(results):
+        return results['cash_balance'].min(axis=1) - floor
+    return margin
+
+# ============================================
+# 參數格點
+# ============================================
+
+def grid_params(base, **axes):
+    # base: 各參數的基準值；axes: 要展開成笛卡兒積的參數及其取值
+    # 回傳 {參數名稱: (N,) 陣列}，N 為各軸取值數的乘積
+    names = list(axes)
+    combos = list(itertools.product(*[np.atleast_1d(axes[name]) for name in names])) or [()]
+    columns = {name: np.full(len(combos), float(base[name])) for name in PARAM_NAMES if name not in axes}
+    for i, name in enumerate(names):
+        columns[name] = np.array([combo[i] for combo in combos], dtype=float)
+    return columns
+
+# ============================================
+# 向量化求解
+# ============================================
+
+# 各參數的有效範圍；區間擴張不會超出此範圍，範圍內無解者回傳 nan
+PARAM_DOMAINS = {
+    'monthly_subscription_price': (0.0, np.inf),
+    'annual_subscription_price': (0.0, np.inf),
+    'subscription_rate': (0.0, 1.0),
+    'rpm': (0.0, np.inf),
+    'personnel_cost_low': (0.0, np.inf),
+    'personnel_cost_high': (0.0, np.inf),
+    'operational_cost': (0.0, np.inf),
+    'initial_capital': (0.0, np.inf),
+}
+
+def solve_threshold(param, target, columns, horizon, lower, upper, increasing=True, xtol=1e-6, max_iter=100, max_expand=20):
+    # 對每一列情境，求 param 的臨界值使 target margin 恰好 >= 0。
+    # increasing=True：margin 隨 param 遞增，求「最低」需求值（如訂閱率、RPM、資金）；
+    # increasing=False：margin 隨 param 遞減，求「最高」可承受值（如成本）。
+    # 任一端不足以夾住目標時皆往外擴張區間（起點端已達成者往有效範圍邊界擴張），但不超出 PARAM_DOMAINS；
+    # 起點端擴張到邊界仍達成者回傳該邊界。
+    # 回傳 {'value': (N,) 陣列（有效範圍內無解者為 nan）, 'feasible': (N,) 布林陣列, 'evaluations': 情境評估次數}
+    horizon = as_horizon(horizon)
+    domain_low, domain_high = PARAM_DOMAINS.get(param, (-np.inf, np.inf))
+    lower, upper = np.clip([float(lower), float(upper)], domain_low, domain_high)
+    columns = {name: np.asarray(value, dtype=float) for name, value in columns.items()}
+    n = max(np.size(value) for value in columns.values())
+    columns = {name: np.broadcast_to(value, (n,)).copy() for name, value in columns.items()}
+    evaluations = 0
+
+    def margin_at(values):
+        nonlocal evaluations
+        columns[param] = values
+        evaluations += n
+        return target(simulate_batch(pack_params(**columns), horizon))
+
+    # 以「未達成端」lo、「達成端」hi 表示區間，兩種方向可共用同一套流程
+    lo = np.full(n, float(lower if increasing else upper))
+    hi = np.full(n, float(upper if increasing else lower))
+    satisfied_at_lo = margin_at(lo) >= 0
+    ok = margin_at(hi) >= 0
+
+    # 起點端已達成：臨界值在更外側，將未達成端往有效範圍邊界加倍擴張，原起點成為達成端
+    lo_bound = domain_low if increasing else domain_high
+    for _ in range(max_expand):
+        expand = satisfied_at_lo & (lo != lo_bound)
+        if not expand.any():
+            break
+        span = hi - lo
+        hi = np.where(expand, lo, hi)
+        ok = ok | expand
+        lo = np.where(expand, np.clip(lo - 2 * span, domain_low, domain_high), lo)
+        satisfied_at_lo = np.where(expand, margin_at(lo) >= 0, satisfied_at_lo)
+
+    # 區間擴張：達成端往外加倍（限制在有效範圍內），直到目標被夾住或已達範圍邊界
+    bound = domain_high if increasing else domain_low
+    for _ in range(max_expand):
+        if (ok | (hi == bound)).all():
+            break
+        span = hi - lo
+        hi = np.where(ok, hi, np.clip(hi + span, domain_low, domain_high))
+        ok = margin_at(hi) >= 0
+
+    feasible = ok | satisfied_at_lo
+    for _ in range(max_iter):
+        if np.all(~ok | (np.abs(hi - lo) <= xtol * (1 + np.abs(hi)))):
+            break
+        mid = (lo + hi) / 2
+        reached = margin_at(mid) >= 0
+        hi = np.where(reached, mid, hi)
+        lo = np.where(reached, lo, mid)
+
+    value = np.where(satisfied_at_lo, lo, hi)
+    value = np.where(feasible, value, np.nan)
+    return {'value': value, 'feasible': feasible, 'evaluations': evaluations}
+
+def required_initial_capital(params, horizon, floor=0):
+    # 初始資金只平移現金水位，可直接求出：floor - 最低累積餘額（不低於 0）
+    results = simulate_batch(params, horizon)
+    return np.maximum(floor - results['cumulative_surplus'].min(axis=1), 0)
+
+# ============================================
+# 常用問題
+# ============================================
+
+def min_subscription_rate_for_breakeven(month, base, horizon, **axes):
+    columns = grid_params(base, **axes)
+    return solve_threshold('subscription_rate', breakeven_by(month), columns, horizon, 0.0, 0.05)
+
+def min_rpm_for_breakeven(month, base, horizon, **axes):
+    columns = grid_params(base, **axes)
+    return solve_threshold('rpm', breakeven_by(month), columns, horizon, 0.0, 200.0)
+
+def max_operational_cost_for_breakeven(month, base, horizon, **axes):
+    columns = grid_params(base, **axes)
+    return solve_threshold('operational_cost', breakeven_by(month), columns, horizon, 0.0, 200000.0, increasing=False)
+
+# ============================================
+# 主程式
+# ============================================
+
+def main():
+    from model import MONTHS_TOTAL, scenario_params
+
+    base = scenario_params()
+
+    print("\n==================== 損益平衡反推 ====================")
+    rate = min_subscription_rate_for_breakeven(18, base, MONTHS_TOTAL)['value'][0]
+    print(f"第 18 月前損益平衡所需最低訂閱率: {rate:.3%}")
+    rpm = min_rpm_for_breakeven(18, base, MONTHS_TOTAL)['value'][0]
+    print(f"第 18 月前損益平衡所需最低 RPM: {rpm:.1f}")
+    capital = required_initial_capital(pack_params(**base), MONTHS_TOTAL)[0]
+    print(f"現金水位不低於 0 所需最低初始資金: {int(capital):,} TWD")
+
+    growth_rates = np.linspace(0.25, 0.40, 4)
+    solved = min_subscription_rate_for_breakeven(18, base, MONTHS_TOTAL, initial_growth_rate=growth_rates)
+    print("\n初期成長率 → 第 18 月前損益平衡所需最低訂閱率")
+    for g, r in zip(growth_rates, solved['value']):
+        print(f"  {g:.2f} → {'無解' if np.isnan(r) else f'{r:.3%}'}")
+    print("================================================")
+
+if __name__ == "__main__":
+    main()
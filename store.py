@@ -0,0 +1,305 @@
+# ============================================
+# AFFINITY財務模擬：記憶體映射的欄式結果庫與索引
+# ============================================
+#
+# 大量情境的參數、摘要指標（與選擇性的各期序列）以每欄一個 .npy 檔存放：
+#   <dir>/meta.json                列數、欄位型別、序列期數與已建立的索引
+#   <dir>/columns/<欄位>.npy       (N,) 參數與指標
+#   <dir>/series/<序列>.npy        (N, T) 各期序列（選擇性）
+#   <dir>/index/<欄位>.keys.npy    排序後的鍵值
+#   <dir>/index/<欄位>.rows.npy    對應的列號
+# 讀取時以 np.load(mmap_mode='r') 直接映射，不複製資料。
+# 查詢先用排序索引以二分搜尋取得候選列（取候選數最少的條件），
+# 再只讀取候選列檢查其餘條件，不需掃描整欄。
+# 損益平衡/資金用盡月份的 0（未發生）在索引與條件中一律視為 +inf。
+#   python store.py build STORE --from-sweep SWEEP_DIR
+#   python store.py query STORE --where "breakeven_month<20" --where "subscription_rate<0.015"
+
+import argparse
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+from engine import PARAM_NAMES
+from instrument import traced
+from sweep import METRIC_DTYPES
+
+META_NAME = "meta.json"
+DEFAULT_INDEXES = ('breakeven_month', 'final_cumulative_surplus', 'min_cash_balance')
+# 0 代表「未發生」的月份欄位
+NEVER_ZERO_COLUMNS = ('breakeven_month', 'cash_out_month')
+# 無索引條件時逐段掃描的列數
+SCAN_CHUNK = 2 ** 20
+
+COLUMN_DTYPES = {**{name: np.float64 for name in PARAM_NAMES}, **METRIC_DTYPES}
+
+def _key(name, values):
+    # 索引與比較用的鍵值：月份欄位的 0 轉為 +inf
+    values = np.asarray(values, dtype=np.float64)
+    if name in NEVER_ZERO_COLUMNS:
+        values = np.where(values == 0, np.inf, values)
+    return values
+
+# ============================================
+# 寫入
+# ============================================
+
+class StoreWriter:
+    # 依序附加批次資料；close() 時建立索引並寫出 meta.json（存在即代表資料完整）
+
+    def __init__(self, path, rows, series=None, indexes=DEFAULT_INDEXES):
+        # series: {序列名稱: 期數}，例如 {'cash_balance': 36}
+        from numpy.lib.format import open_memmap
+
+        self.path = path
+        self.rows = int(rows)
+        self.indexes = tuple(indexes)
+        self.series_periods = dict(series or {})
+        self.offset = 0
+        for sub in ('columns', 'series', 'index'):
+            os.makedirs(os.path.join(path, sub), exist_ok=True)
+        meta_path = os.path.join(path, META_NAME)
+        if os.path.exists(meta_path):
+            os.unlink(meta_path)
+        self.columns = {
+            name: open_memmap(os.path.join(path, 'columns', name + '.npy'), mode='w+', dtype=dtype, shape=(self.rows,))
+            for name, dtype in COLUMN_DTYPES.items()
+        }
+        self.series = {
+            name: open_memmap(os.path.join(path, 'series', name + '.npy'), mode='w+', dtype=np.float64, shape=(self.rows, periods))
+            for name, periods in self.series_periods.items()
+        }
+
+    def append(self, columns, series=None):
+        # columns: 所有 COLUMN_DTYPES 欄位（純量會廣播）；series: 本批的 (n, T) 序列
+        n = max(np.size(value) for value in columns.values())
+        end = self.offset + n
+        if end > self.rows:
+            raise ValueError(f"超過預先配置的 {self.rows:,} 列")
+        for name, column in self.columns.items():
+            column[self.offset:end] = columns[name]
+        for name, array in self.series.items():
+            array[self.offset:end] = series[name]
+        self.offset = end
+
+    @traced('store.close')
+    def close(self):
+        if self.offset != self.rows:
+            raise ValueError(f"只寫入 {self.offset:,} / {self.rows:,} 列")
+        for array in (*self.columns.values(), *self.series.values()):
+            array.flush()
+        for name in self.indexes:
+            _build_index(self.path, name, self.columns[name])
+        meta = {
+            'rows': self.rows,
+            'columns': {name: np.dtype(dtype).name for name, dtype in COLUMN_DTYPES.items()},
+            'series': self.series_periods,
+            'indexes': list(self.indexes),
+        }
+        _write_meta(self.path, meta)
+        self.columns = self.series = {}
+
+def _write_meta(path, meta):
+    tmp_path = os.path.join(path, META_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, META_NAME))
+
+def _build_index(path, name, values):
+    keys = _key(name, values)
+    rows = np.argsort(keys, kind='stable')
+    np.save(os.path.join(path, 'index', name + '.keys.npy'), keys[rows])
+    np.save(os.path.join(path, 'index', name + '.rows.npy'), rows.astype(np.int64))
+
+def store_from_results(path, params, results, series=(), indexes=DEFAULT_INDEXES):
+    # 由 simulate_batch 的輸出建立結果庫；series 為要保存的序列名稱
+    from engine import batch_metrics, unpack_params
+
+    params = np.atleast_2d(params)
+    metrics = batch_metrics(results)
+    writer = StoreWriter(
+        path, params.shape[0], {name: results[name].shape[1] for name in series}, indexes
+    )
+    writer.append({**unpack_params(params), **metrics}, {name: results[name] for name in series})
+    writer.close()
+    return ResultStore(path)
+
+def store_from_sweep(path, sweep_dir, indexes=DEFAULT_INDEXES):
+    # 由 sweep.py 的分片輸出建立結果庫（參數由格點規格還原）；需所有分片皆已完成
+    from sweep import grid_columns, iter_shards, load_spec, sweep_status
+
+    spec = load_spec(sweep_dir)
+    status = sweep_status(sweep_dir)
+    if status['done'] != spec['shards']:
+        raise ValueError(f"掃描尚未完成: {status['done']:,} / {spec['shards']:,} 個分片")
+    writer = StoreWriter(path, spec['points'], indexes=indexes)
+    for start, stop, metrics in iter_shards(sweep_dir):
+        writer.append({**grid_columns(spec, start, stop), **metrics})
+    writer.close()
+    return ResultStore(path)
+
+# ============================================
+# 讀取與查詢
+# ============================================
+
+# 比較運算子 → (searchsorted 下界 side, 上界 side)；None 代表不限
+_OPERATORS = {
+    '<': (None, 'left'),
+    '<=': (None, 'right'),
+    '>': ('right', None),
+    '>=': ('left', None),
+    '==': ('left', 'right'),
+}
+
+_COMPARE = {
+    '<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal, '==': np.equal,
+}
+
+class ResultStore:
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_NAME), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.rows = self.meta['rows']
+        self._mapped = {}
+
+    def __len__(self):
+        return self.rows
+
+    def _load(self, *parts):
+        relative = os.path.join(*parts) + '.npy'
+        if relative not in self._mapped:
+            self._mapped[relative] = np.load(os.path.join(self.path, relative), mmap_mode='r')
+        return self._mapped[relative]
+
+    def __getitem__(self, name):
+        # 唯讀的記憶體映射欄位
+        if name not in self.meta['columns']:
+            raise KeyError(name)
+        return self._load('columns', name)
+
+    def series(self, name):
+        if name not in self.meta['series']:
+            raise KeyError(name)
+        return self._load('series', name)
+
+    def create_index(self, name):
+        _build_index(self.path, name, self[name])
+        if name not in self.meta['indexes']:
+            self.meta['indexes'].append(name)
+            _write_meta(self.path, self.meta)
+
+    def _index_range(self, name, operator, value):
+        # 索引中符合條件的位置區間 [lo, hi)
+        keys = self._load('index', name + '.keys')
+        value = _key(name, value)
+        low_side, high_side = _OPERATORS[operator]
+        lo = int(np.searchsorted(keys, value, side=low_side)) if low_side else 0
+        hi = int(np.searchsorted(keys, value, side=high_side)) if high_side else len(keys)
+        return lo, max(lo, hi)
+
+    def count(self, name, operator, value):
+        # 以索引計算符合單一條件的列數
+        lo, hi = self._index_range(name, operator, value)
+        return hi - lo
+
+    @traced('store.where')
+    def where(self, *conditions):
+        # conditions: (欄位, 運算子, 值)；回傳符合所有條件的列號（遞增）
+        for name, operator, _ in conditions:
+            if name not in self.meta['columns']:
+                raise KeyError(name)
+            if operator not in _OPERATORS:
+                raise ValueError(f"不支援的運算子: {operator}")
+        indexed = [c for c in conditions if c[0] in self.meta['indexes']]
+        if indexed:
+            ranges = {c: self._index_range(*c) for c in indexed}
+            driver = min(ranges, key=lambda c: ranges[c][1] - ranges[c][0])
+            lo, hi = ranges[driver]
+            # 依列號排序，讓其餘欄位的讀取盡量循序
+            rows = np.sort(self._load('index', driver[0] + '.rows')[lo:hi])
+            return self._filter(rows, [c for c in conditions if c != driver])
+        matches = [
+            self._filter(np.arange(start, min(start + SCAN_CHUNK, self.rows)), conditions)
+            for start in range(0, self.rows, SCAN_CHUNK)
+        ]
+        return np.concatenate(matches) if matches else np.empty(0, dtype=np.int64)
+
+    @traced('store.top')
+    def top(self, name, k, largest=True):
+        # 依欄位值排序的前 k 列列號（largest=False 為最小的 k 列）；有索引時只讀取索引的一端
+        if name not in self.meta['columns']:
+            raise KeyError(name)
+        k = max(0, min(int(k), self.rows))
+        if name in self.meta['indexes']:
+            rows = self._load('index', name + '.rows')
+            return np.asarray(rows[self.rows - k:][::-1] if largest else rows[:k])
+        keys = _key(name, self[name])
+        order = np.argsort(-keys if largest else keys, kind='stable')
+        return order[:k]
+
+    def _filter(self, rows, conditions):
+        for name, operator, value in conditions:
+            if not len(rows):
+                break
+            keep = _COMPARE[operator](_key(name, self[name][rows]), _key(name, value))
+            rows = rows[keep]
+        return rows
+
+    def fetch(self, rows, columns=None):
+        # 取出指定列的欄位值 {欄位: 陣列}
+        columns = columns or list(self.meta['columns'])
+        return {name: np.asarray(self[name][rows]) for name in columns}
+
+# ============================================
+# 主程式
+# ============================================
+
+_CONDITION = re.compile(r'^\s*(\w+)\s*(<=|>=|==|<|>)\s*([-+0-9.eE]+|inf)\s*$')
+
+def parse_condition(text):
+    # "breakeven_month<20" → ('breakeven_month', '<', 20.0)
+    match = _CONDITION.match(text)
+    if not match:
+        raise argparse.ArgumentTypeError(f"條件格式應為 欄位<值，例如 breakeven_month<20: {text}")
+    name, operator, value = match.groups()
+    return name, operator, float(value)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AFFINITY 結果庫")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="由掃描結果建立結果庫")
+    build.add_argument('store')
+    build.add_argument('--from-sweep', required=True, help="sweep.py 的掃描目錄")
+    build.add_argument('--index', action='append', help="要建立索引的欄位（可重複；預設為摘要指標）")
+
+    query = sub.add_parser('query', help="查詢結果庫")
+    query.add_argument('store')
+    query.add_argument('--where', type=parse_condition, action='append', default=[], help="例如 breakeven_month<20")
+    query.add_argument('--limit', type=int, default=20, help="最多列出幾筆")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        store = store_from_sweep(args.store, args.from_sweep, args.index or DEFAULT_INDEXES)
+        print(f"結果庫已儲存至: {args.store}（{len(store):,} 列，索引: {', '.join(store.meta['indexes'])}）")
+        return 0
+
+    store = ResultStore(args.store)
+    rows = store.where(*args.where)
+    print(f"符合條件: {len(rows):,} / {len(store):,} 列")
+    if len(rows):
+        # 列出條件涉及的欄位與摘要指標
+        names = list(dict.fromkeys([name for name, *_ in args.where] + list(DEFAULT_INDEXES)))
+        shown = store.fetch(rows[:args.limit], names)
+        print("  ".join([f"{'row':>12}"] + [f"{name:>26}" for name in names]))
+        for i, row in enumerate(rows[:args.limit]):
+            print("  ".join([f"{row:>12}"] + [f"{shown[name][i]:>26,.6g}" for name in names]))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
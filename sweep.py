@@ -0,0 +1,306 @@
+# ============================================
+# AFFINITY財務模擬：可續跑的分片參數格點掃描
+# ============================================
+#
+# 對多個假設因子的笛卡兒積（可達 10^8 點以上）計算摘要指標。
+# 格點依攤平後的索引切成固定大小的分片，工作佇列完全以檔案表示：
+#   <dir>/sweep.json          格點規格（各軸取值、基準值、期間、分片大小）
+#   <dir>/todo/<分片>          待處理
+#   <dir>/claimed/<分片>       處理中（以 os.rename 原子性認領，內容為主機與行程）
+#   <dir>/done/<分片>.npz      完成的分片輸出（先寫暫存檔再 os.replace）
+# 工作行程直接寫出各自的分片檔，不經 pickle 傳回大型結果；
+# 中斷後重新執行 run 會把失效的認領放回 todo 並從中斷處繼續。
+# 多台機器共用同一檔案系統時，各自執行 run 即可分攤同一份佇列。
+#   python sweep.py init DIR --axis rpm=40:90:11 --axis subscription_rate=0.01:0.03:21
+#   python sweep.py run DIR --workers 8
+#   python sweep.py status DIR
+
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+
+import numpy as np
+
+from engine import PARAM_NAMES, Horizon, chunk_rows, pack_params, summarize_batch
+from instrument import traced
+
+SPEC_NAME = "sweep.json"
+DEFAULT_SHARD_SIZE = 2 ** 16
+# 認領超過此秒數仍未完成者視為失效（其他主機的工作行程無法檢查是否存活）
+STALE_AFTER = 3600
+# 分片輸出的欄位與型別
+METRIC_DTYPES = {
+    'breakeven_month': np.int32,
+    'cash_out_month': np.int32,
+    'min_cash_month': np.int32,
+    'min_cash_balance': np.float64,
+    'runway_months': np.float64,
+    'final_cumulative_surplus': np.float64,
+}
+
+def parse_values(text):
+    # "start:stop:count" 產生等差數列；否則視為逗號分隔的數值
+    if ':' in text:
+        start, stop, count = text.split(':')
+        count = int(count)
+        step = (float(stop) - float(start)) / (count - 1) if count > 1 else 0
+        return [float(start) + step * i for i in range(count)]
+    return [float(value) for value in text.split(',')]
+
+# ============================================
+# 格點規格
+# ============================================
+
+def _shard_name(shard):
+    return f"{shard:08d}"
+
+def _dirs(sweep_dir):
+    return {name: os.path.join(sweep_dir, name) for name in ('todo', 'claimed', 'done')}
+
+def load_spec(sweep_dir):
+    with open(os.path.join(sweep_dir, SPEC_NAME), encoding='utf-8') as f:
+        return json.load(f)
+
+def grid_shape(spec):
+    return tuple(len(values) for values in spec['axes'].values())
+
+def shard_bounds(spec, shard):
+    start = shard * spec['shard_size']
+    return start, min(start + spec['shard_size'], spec['points'])
+
+def grid_columns(spec, start, stop):
+    # 攤平索引 [start, stop) 對應的參數欄位；未展開的參數取基準值
+    indices = np.unravel_index(np.arange(start, stop), grid_shape(spec))
+    columns = dict(spec['base'])
+    for index, (name, values) in zip(indices, spec['axes'].items()):
+        columns[name] = np.asarray(values, dtype=float)[index]
+    return columns
+
+def create_sweep(sweep_dir, axes, base, periods, step='month', shard_size=DEFAULT_SHARD_SIZE):
+    # 建立（或補齊中斷的）掃描目錄；已存在時規格需一致
+    unknown = set(axes) - set(PARAM_NAMES)
+    if unknown:
+        raise ValueError(f"未知參數: {', '.join(sorted(unknown))}")
+    Horizon(periods=periods, step=step)  # 先驗證期間
+    axes = {name: [float(v) for v in values] for name, values in axes.items()}
+    points = int(np.prod([len(values) for values in axes.values()], dtype=np.int64))
+    spec = {
+        'axes': axes,
+        'base': {name: float(base[name]) for name in PARAM_NAMES},
+        'periods': int(periods),
+        'step': step,
+        'shard_size': int(shard_size),
+        'points': points,
+        'shards': -(-points // int(shard_size)),
+    }
+
+    spec_path = os.path.join(sweep_dir, SPEC_NAME)
+    if os.path.exists(spec_path):
+        if load_spec(sweep_dir) != spec:
+            raise ValueError(f"{sweep_dir} 已有不同規格的掃描")
+    else:
+        os.makedirs(sweep_dir, exist_ok=True)
+        tmp_path = f"{spec_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(spec, f, indent=2)
+        os.replace(tmp_path, spec_path)
+
+    dirs = _dirs(sweep_dir)
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+    existing = set(os.listdir(dirs['todo'])) | set(os.listdir(dirs['claimed']))
+    existing |= {name[:-len('.npz')] for name in os.listdir(dirs['done']) if name.endswith('.npz')}
+    for shard in range(spec['shards']):
+        name = _shard_name(shard)
+        if name not in existing:
+            open(os.path.join(dirs['todo'], name), 'w').close()
+    return spec
+
+# ============================================
+# 工作佇列
+# ============================================
+
+def _owner():
+    return f"{socket.gethostname()} {os.getpid()}"
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def requeue_stale(sweep_dir, stale_after=STALE_AFTER):
+    # 將失效的認領放回 todo：本機已結束的行程，或超過 stale_after 秒未完成者
+    dirs = _dirs(sweep_dir)
+    host = socket.gethostname()
+    requeued = 0
+    for name in os.listdir(dirs['claimed']):
+        path = os.path.join(dirs['claimed'], name)
+        try:
+            if os.path.exists(os.path.join(dirs['done'], name + '.npz')):
+                os.unlink(path)
+                continue
+            with open(path, encoding='utf-8') as f:
+                owner = f.read().split()
+            # rename 會更新 ctime（多數檔案系統），剛認領但尚未 utime 的分片也不會被視為過期
+            stat = os.stat(path)
+            age = time.time() - max(stat.st_mtime, stat.st_ctime)
+        except FileNotFoundError:
+            continue
+        dead = len(owner) == 2 and owner[0] == host and not _pid_alive(int(owner[1]))
+        if dead or age > stale_after:
+            try:
+                os.rename(path, os.path.join(dirs['todo'], name))
+                requeued += 1
+            except FileNotFoundError:
+                pass
+    return requeued
+
+def claim_shard(sweep_dir):
+    # 認領一個待處理分片；回傳分片編號，佇列已空時回傳 None
+    dirs = _dirs(sweep_dir)
+    names = sorted(os.listdir(dirs['todo']))
+    # 各行程從不同位置開始，減少同時認領同一分片的競爭
+    offset = os.getpid() % len(names) if names else 0
+    for name in names[offset:] + names[:offset]:
+        claimed = os.path.join(dirs['claimed'], name)
+        try:
+            os.rename(os.path.join(dirs['todo'], name), claimed)
+        except FileNotFoundError:
+            continue  # 已被其他行程認領
+        # rename 保留建立掃描時的 mtime，立即更新，避免 requeue_stale 把剛認領的分片視為過期
+        os.utime(claimed)
+        with open(claimed, 'w', encoding='utf-8') as f:
+            f.write(_owner())
+        return int(name)
+    return None
+
+@traced('sweep.shard')
+def compute_shard(spec, shard):
+    # 回傳分片內每個格點的摘要指標 {欄位: (分片大小,) 陣列}
+    start, stop = shard_bounds(spec, shard)
+    horizon = Horizon(periods=spec['periods'], step=spec['step'])
+    chunk = chunk_rows(horizon)
+    output = {name: np.empty(stop - start, dtype=dtype) for name, dtype in METRIC_DTYPES.items()}
+    for offset in range(start, stop, chunk):
+        end = min(offset + chunk, stop)
+        metrics = summarize_batch(pack_params(**grid_columns(spec, offset, end)), horizon)
+        for name in METRIC_DTYPES:
+            output[name][offset - start:end - start] = metrics[name]
+    return output
+
+def write_shard(sweep_dir, shard, output):
+    done = _dirs(sweep_dir)['done']
+    name = _shard_name(shard)
+    tmp_path = os.path.join(done, f".{name}.{socket.gethostname()}.{os.getpid()}.tmp.npz")
+    np.savez(tmp_path, **output)
+    os.replace(tmp_path, os.path.join(done, name + '.npz'))
+    try:
+        os.unlink(os.path.join(_dirs(sweep_dir)['claimed'], name))
+    except FileNotFoundError:
+        pass  # 已被判定失效並由其他行程重做
+
+def worker_loop(sweep_dir, stale_after=STALE_AFTER):
+    # 持續認領並完成分片，直到佇列清空；回傳完成的分片數
+    spec = load_spec(sweep_dir)
+    completed = 0
+    while True:
+        shard = claim_shard(sweep_dir)
+        if shard is None and requeue_stale(sweep_dir, stale_after):
+            continue
+        if shard is None:
+            return completed
+        write_shard(sweep_dir, shard, compute_shard(spec, shard))
+        completed += 1
+
+def run_sweep(sweep_dir, workers=None, stale_after=STALE_AFTER):
+    # 以行程池在本機執行；其他機器可對同一目錄同時執行
+    requeue_stale(sweep_dir, stale_after)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        return worker_loop(sweep_dir, stale_after)
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(worker_loop, sweep_dir, stale_after) for _ in range(workers)]
+        return sum(future.result() for future in futures)
+
+# ============================================
+# 進度與結果
+# ============================================
+
+def sweep_status(sweep_dir):
+    dirs = _dirs(sweep_dir)
+    done = [name for name in os.listdir(dirs['done']) if name.endswith('.npz') and not name.startswith('.')]
+    return {
+        'shards': load_spec(sweep_dir)['shards'],
+        'todo': len(os.listdir(dirs['todo'])),
+        'claimed': len(os.listdir(dirs['claimed'])),
+        'done': len(done),
+    }
+
+def iter_shards(sweep_dir):
+    # 依序產生已完成分片的 (start, stop, 指標 dict)；未完成的分片略過
+    spec = load_spec(sweep_dir)
+    done = _dirs(sweep_dir)['done']
+    for shard in range(spec['shards']):
+        path = os.path.join(done, _shard_name(shard) + '.npz')
+        if not os.path.exists(path):
+            continue
+        start, stop = shard_bounds(spec, shard)
+        with np.load(path) as data:
+            yield start, stop, {name: data[name] for name in data.files}
+
+# ============================================
+# 主程式
+# ============================================
+
+def _parse_axis(text):
+    name, _, values = text.partition('=')
+    if not values:
+        raise argparse.ArgumentTypeError(f"格式應為 name=start:stop:count 或 name=v1,v2,...: {text}")
+    return name, parse_values(values)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AFFINITY 分片參數格點掃描")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    init = sub.add_parser('init', help="建立掃描目錄與工作佇列")
+    init.add_argument('directory')
+    init.add_argument('--axis', type=_parse_axis, action='append', default=[], help="name=start:stop:count 或 name=v1,v2,...")
+    init.add_argument('--scenario', help="未展開參數的基準值（情境檔中的情境鍵，預設為基準情境）")
+    init.add_argument('--months', type=int, help="模擬月數（預設 MONTHS_TOTAL）")
+    init.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE)
+
+    run = sub.add_parser('run', help="處理佇列（可中斷後重跑、可多台機器同時執行）")
+    run.add_argument('directory')
+    run.add_argument('--workers', type=int, help="本機工作行程數（預設 CPU 核心數）")
+    run.add_argument('--stale-after', type=float, default=STALE_AFTER, help="認領失效秒數")
+
+    status = sub.add_parser('status', help="顯示進度")
+    status.add_argument('directory')
+    args = parser.parse_args(argv)
+
+    if args.command == 'init':
+        from model import MONTHS_TOTAL, scenario_params
+        try:
+            base = scenario_params(args.scenario)
+        except KeyError as e:
+            parser.error(e.args[0])
+        spec = create_sweep(args.directory, dict(args.axis), base, args.months or MONTHS_TOTAL, shard_size=args.shard_size)
+        print(f"格點數: {spec['points']:,}，分片數: {spec['shards']:,}（每片 {spec['shard_size']:,} 點）")
+    elif args.command == 'run':
+        started = time.perf_counter()
+        completed = run_sweep(args.directory, args.workers, args.stale_after)
+        print(f"本次完成 {completed:,} 個分片，耗時 {time.perf_counter() - started:.1f} 秒")
+    status = sweep_status(args.directory)
+    print(f"分片: 完成 {status['done']:,} / {status['shards']:,}，處理中 {status['claimed']:,}，待處理 {status['todo']:,}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bench
+
+def _case(samples, peak=0, name='kernels', scenarios=100, periods=36):
+    case = bench._timing(list(samples), peak, {})
+    case.update(name=name, scenarios=scenarios, periods=periods, throughput=scenarios * periods / case['seconds'])
+    return case
+
+def test_noisy_cases_need_a_larger_gap():
+    baseline = {'cases': [_case([0.100, 0.110, 0.115, 0.120, 0.130])]}
+    # 最佳值慢 20%，但兩次執行的離散程度都超過 10%：不算退步
+    noisy = {'cases': [_case([0.120, 0.135, 0.140, 0.150, 0.160])]}
+    assert bench.compare(noisy, baseline, 0.10) == []
+    # 同樣的差距在穩定的量測下算退步
+    stable_baseline = {'cases': [_case([0.100] * 5)]}
+    stable = {'cases': [_case([0.120] * 5)]}
+    assert len(bench.compare(stable, stable_baseline, 0.10)) == 1
+
+def test_noise_floor_ignores_tiny_cases():
+    baseline = {'cases': [_case([0.0010] * 5)]}
+    report = {'cases': [_case([0.0020] * 5)]}
+    assert bench.compare(report, baseline, 0.10) == []
+
+def test_transient_slowdown_is_confirmed_away(monkeypatch):
+    baseline = {'cases': [_case([0.100] * 5)]}
+    report = {'cases': [_case([0.200] * 5)]}
+    monkeypatch.setattr(bench, 'run_case', lambda name, n, periods, repeat: _case([0.101] * 5, name=name, scenarios=n, periods=periods))
+    assert bench.confirm_regressions(report, baseline, 0.10, 5) == []
+    assert report['cases'][0]['seconds'] == 0.101
+    assert len(report['cases'][0]['samples']) == 10
+
+def test_persistent_regression_is_reported(monkeypatch):
+    baseline = {'cases': [_case([0.100] * 5)]}
+    report = {'cases': [_case([0.200] * 5)]}
+    calls = []
+
+    def slow(name, n, periods, repeat):
+        calls.append(name)
+        return _case([0.200] * 5, name=name, scenarios=n, periods=periods)
+
+    monkeypatch.setattr(bench, 'run_case', slow)
+    regressions = bench.confirm_regressions(report, baseline, 0.10, 5, rounds=2)
+    assert len(regressions) == 1 and len(calls) == 2
+
+def test_old_baselines_without_samples_still_compare():
+    baseline = {'cases': [{'name': 'kernels', 'scenarios': 100, 'periods': 36, 'seconds': 0.100, 'peak_bytes': 0}]}
+    report = {'cases': [_case([0.200] * 5)]}
+    assert len(bench.compare(report, baseline, 0.10)) == 1
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 含 Python 直譯器本身的啟動時間，留足 CI 機器的餘裕
+BUDGET_MS = 1500
+
+def _run(*args):
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT, capture_output=True, text=True, timeout=60,
+    )
+
+def test_summary_does_not_import_heavy_modules():
+    # 在子行程中執行 summary，之後檢查 sys.modules
+    code = (
+        "import sys, cli\n"
+        "cli.main(['summary'])\n"
+        "print(','.join(name for name in cli.HEAVY_MODULES if name in sys.modules))\n"
+    )
+    result = _run('-c', code)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-1] == ''
+
+def test_summary_import_budget():
+    result = _run('cli.py', 'summary', '--import-budget-ms', str(BUDGET_MS))
+    assert result.returncode == 0, result.stderr
+    assert "Baseline Scenario" in result.stdout
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cohort
+from engine import Horizon
+
+HORIZONS = {'month': Horizon(periods=36), 'week': Horizon(step='week', years=3)}
+
+def _naive_convolve(new_subscribers, kernel):
+    # 逐世代累加：第 c 期世代在第 t 期貢獻 new_subscribers[c] × kernel[t - c]
+    rows = max(new_subscribers.shape[0], kernel.shape[0])
+    new_subscribers = np.broadcast_to(new_subscribers, (rows, new_subscribers.shape[1]))
+    kernel = np.broadcast_to(kernel, (rows, kernel.shape[1]))
+    periods = new_subscribers.shape[1]
+    total = np.zeros((rows, periods))
+    for c in range(periods):
+        total[:, c:] += new_subscribers[:, c:c + 1] * kernel[:, :periods - c]
+    return total
+
+@pytest.mark.parametrize('step', sorted(HORIZONS))
+@pytest.mark.parametrize('dense_max_cells', [np.inf, 0], ids=['dense', 'fft'])
+def test_convolve_matches_per_cohort_sum(monkeypatch, step, dense_max_cells):
+    monkeypatch.setattr(cohort, 'DENSE_MAX_CELLS', dense_max_cells)
+    horizon = HORIZONS[step]
+    rng = np.random.default_rng(3)
+    new_subscribers = rng.uniform(0, 50, (4, horizon.periods))
+    monthly_survival, _, annual_payment = cohort.retention_kernels(horizon, [0.05, 0.08, 0.1, 0.2], 0.6)
+    for kernel in (monthly_survival, annual_payment):
+        expected = _naive_convolve(new_subscribers, kernel)
+        np.testing.assert_allclose(cohort.batch_convolve(new_subscribers, kernel), expected, rtol=1e-9, atol=1e-8)
+
+@pytest.mark.parametrize('step', sorted(HORIZONS))
+def test_annual_payment_and_renewal_kernel(step):
+    horizon = HORIZONS[step]
+    renewal = 0.6
+    _, annual_survival, annual_payment = cohort.retention_kernels(horizon, 0.08, renewal)
+    # 加入當期與第 12、24 個月（該步長下每年的第一期）付年費，金額比例為 renewal ** 續約次數
+    per_year = int(round(12 * horizon.periods_per_month))
+    due = np.flatnonzero(annual_payment[0])
+    assert due.tolist() == [0, per_year, 2 * per_year]
+    np.testing.assert_allclose(annual_payment[0, due], [1, renewal, renewal ** 2])
+    terms = np.arange(horizon.periods) // per_year
+    np.testing.assert_allclose(annual_survival[0], renewal ** terms)
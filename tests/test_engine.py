@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import Horizon, pack_params, simulate_batch
+
+# 基準版本(baseline commit)的逐月迴圈 calculate_mau / calculate_revenues / calculate_cash_flow
+# 在 36 個月下的輸出；批次引擎需重現這些數值
+BASELINE = dict(
+    initial_growth_rate=0.34, final_growth_rate=0.03, monthly_subscription_price=320, annual_subscription_price=3200,
+    subscription_rate=0.02, rpm=65, personnel_cost_low=140000, personnel_cost_high=280000, operational_cost=53968,
+    initial_capital=6200000,
+)
+CONSERVATIVE = dict(BASELINE, initial_growth_rate=0.272, final_growth_rate=0.024, subscription_rate=0.016, rpm=52.0)
+MONTHS_TOTAL = 36
+
+# {月份: (MAU, 當月收入, 累積餘額)}
+FROZEN = {
+    'baseline': {
+        3: (1340.0, 15808.02466666667, -706095.9753333332),
+        12: (15999.056828877798, 188741.4067121657, -2971923.596540362),
+        24: (140393.85519488194, 1656230.9895291957, 2966340.621474675),
+        36: (304153.1484759087, 3588104.8310085777, 32598443.059164405),
+    },
+    'conservative': {
+        3: (1272.0, 12004.925696000002, -709899.074304),
+        12: (9740.30959753819, 91927.43158371198, -3310283.736175581),
+        24: (57133.552093242884, 539217.0185754136, -3716355.827478231),
+        36: (106524.49267417543, 1005360.5498094124, 2136680.2941237255),
+    },
+}
+FROZEN_BREAKEVEN = {'baseline': 22, 'conservative': 33}
+
+def _params():
+    return pack_params(**{name: [BASELINE[name], CONSERVATIVE[name]] for name in BASELINE})
+
+def test_matches_per_month_loop():
+    results = simulate_batch(_params(), MONTHS_TOTAL)
+    for row, key in enumerate(('baseline', 'conservative')):
+        assert results['breakeven_month'][row] == FROZEN_BREAKEVEN[key]
+        for month, (mau, revenue, surplus) in FROZEN[key].items():
+            assert results['mau'][row, month - 1] == pytest.approx(mau, rel=1e-9)
+            assert results['monthly_revenue'][row, month - 1] == pytest.approx(revenue, rel=1e-9)
+            assert results['cumulative_surplus'][row, month - 1] == pytest.approx(surplus, rel=1e-9)
+        # 前兩個月無 MAU 與收入
+        assert not results['mau'][row, :2].any()
+        assert not results['monthly_revenue'][row, :2].any()
+
+@pytest.mark.parametrize('step', ['week', 'day'])
+def test_finer_steps_agree_on_breakeven(step):
+    horizon = Horizon(step=step, years=MONTHS_TOTAL / 12)
+    breakeven = simulate_batch(_params(), horizon)['breakeven_month']
+    months = horizon.period_to_month(breakeven)
+    expected = np.array([FROZEN_BREAKEVEN['baseline'], FROZEN_BREAKEVEN['conservative']])
+    assert np.all(breakeven > 0)
+    assert np.all(np.abs(months - expected) <= 1)
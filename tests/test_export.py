@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import export
+from engine import pack_params, simulate_batch
+from model import MONTHS_TOTAL, scenario_params
+from results import SERIES_COLUMNS
+
+N = 7
+
+@pytest.fixture(scope='module')
+def results():
+    columns = dict(scenario_params())
+    columns['subscription_rate'] = np.linspace(0.01, 0.04, N)
+    results = dict(simulate_batch(pack_params(**columns), MONTHS_TOTAL))
+    # 非有限值需在 JSONL 中寫成 null
+    results['cash_flow'] = results['cash_flow'].copy()
+    results['cash_flow'][0, 3] = np.inf
+    results['cash_flow'][2, 5] = -np.inf
+    results['cash_flow'][4, 7] = np.nan
+    return results
+
+def _names():
+    return [f"s{i}" for i in range(N)]
+
+# batch_rows 小於、等於與大於一個情境的期數，涵蓋多種批次邊界
+BATCH_ROWS = [1, MONTHS_TOTAL, MONTHS_TOTAL * 2 + 5, 10 ** 6]
+
+@pytest.mark.parametrize('batch_rows', BATCH_ROWS)
+def test_csv_round_trip(results, batch_rows):
+    f = io.StringIO()
+    rows = export.write_csv(export.batches_from_batch(_names(), results, batch_rows), f)
+    f.seek(0)
+    parsed = list(csv.DictReader(f))
+    assert rows == len(parsed) == N * MONTHS_TOTAL
+    assert list(parsed[0]) == list(export.COLUMNS)
+    for i, row in enumerate(parsed):
+        scenario, month = divmod(i, MONTHS_TOTAL)
+        assert row['scenario'] == f"s{scenario}"
+        assert int(row['month']) == month + 1
+        for name in SERIES_COLUMNS:
+            np.testing.assert_equal(float(row[name]), results[name][scenario, month])
+
+@pytest.mark.parametrize('batch_rows', BATCH_ROWS)
+def test_jsonl_round_trip(results, batch_rows):
+    f = io.StringIO()
+    rows = export.write_jsonl(export.batches_from_batch(_names(), results, batch_rows), f)
+    lines = f.getvalue().splitlines()
+    assert rows == len(lines) == N * MONTHS_TOTAL
+    for i, line in enumerate(lines):
+        row = json.loads(line)
+        scenario, month = divmod(i, MONTHS_TOTAL)
+        assert row['scenario'] == f"s{scenario}"
+        assert row['month'] == month + 1
+        for name in SERIES_COLUMNS:
+            expected = results[name][scenario, month]
+            if np.isfinite(expected):
+                assert isinstance(row[name], (int, float)) and row[name] == expected
+            else:
+                assert row[name] is None
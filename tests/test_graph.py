@@ -0,0 +1,58 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import PARAM_NAMES
+from graph import OUTPUT_STAGE, PARAM_STAGE, STAGE_ORDER, ScenarioGraph
+
+BASE = dict(
+    initial_growth_rate=0.34, final_growth_rate=0.03, monthly_subscription_price=320, annual_subscription_price=3200,
+    subscription_rate=0.02, rpm=65, personnel_cost_low=140000, personnel_cost_high=280000, operational_cost=53968,
+    initial_capital=6200000,
+)
+MONTHS_TOTAL = 36
+
+def _read_all(graph):
+    return {output: graph[output] for output in OUTPUT_STAGE}
+
+def _assert_equal(actual, expected):
+    for output in OUTPUT_STAGE:
+        if output == 'metrics':
+            for name, value in expected[output].items():
+                np.testing.assert_allclose(actual[output][name], value, rtol=1e-9)
+        else:
+            np.testing.assert_allclose(actual[output], expected[output], rtol=1e-9, atol=1e-6)
+
+def test_random_edits_match_clean_evaluation():
+    rng = np.random.default_rng(20240101)
+    graph = ScenarioGraph(MONTHS_TOTAL, **BASE)
+    params = dict(BASE)
+    _read_all(graph)
+    for _ in range(200):
+        names = rng.choice(PARAM_NAMES, size=rng.integers(1, 4), replace=False)
+        changes = {name: BASE[name] * rng.uniform(0.5, 1.5) for name in names}
+        params.update(changes)
+        before = dict(graph.recomputed)
+        graph.set(**changes)
+        actual = _read_all(graph)
+        _assert_equal(actual, _read_all(ScenarioGraph(MONTHS_TOTAL, **params)))
+
+        # 最早受影響的階段之前的各階段不得重算
+        first = min(STAGE_ORDER.index(PARAM_STAGE[name]) for name in names)
+        for stage in STAGE_ORDER[:first]:
+            assert graph.recomputed[stage] == before.get(stage, 0), (stage, names)
+        # 只改成本時，現金流只做部分重算
+        if all(PARAM_STAGE[name] == 'cash_flow' for name in names):
+            assert graph.recomputed['cash_flow'] == before.get('cash_flow', 0)
+            assert graph.recomputed['cash_flow (partial)'] == before.get('cash_flow (partial)', 0) + 1
+
+def test_unchanged_reads_do_not_recompute():
+    graph = ScenarioGraph(MONTHS_TOTAL, **BASE)
+    _read_all(graph)
+    before = dict(graph.recomputed)
+    graph.set(rpm=BASE['rpm'])  # 與現值相同，不應標記為 dirty
+    _read_all(graph)
+    assert dict(graph.recomputed) == before
@@ -0,0 +1,30 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instrument
+import render
+
+def _specs(n):
+    return [
+        render.figure_spec(f"fig_{i}.png", [render.op('plot', [1, 2, 3], [i, i + 1, i])], figsize=(2, 2))
+        for i in range(n)
+    ]
+
+def test_worker_counters_are_not_double_counted(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrument, '_enabled', True)
+    monkeypatch.setattr(instrument, '_events', [])
+    monkeypatch.setattr(instrument, '_counters', instrument.Counter())
+    monkeypatch.setattr(render, 'DPI', 20)
+
+    render.render_figures(_specs(3), output_dir=str(tmp_path), workers=2)
+    # 主行程此時已有計數；工作行程繼承後不得再透過 merge() 重複加回
+    result = render.render_figures(_specs(6), output_dir=str(tmp_path), workers=3)
+
+    assert len(result['skipped']) == 3
+    assert len(result['rendered']) == 3
+    assert instrument._counters['render.skipped'] == 3
+    assert instrument._counters['render.rendered'] == 6
+    figures = [event for event in instrument._events if event['name'] == 'render.figure']
+    assert len(figures) == 6
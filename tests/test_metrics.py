@@ -0,0 +1,50 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import batch_metrics
+
+# (初始資金, 每月現金流, 預期指標)；月份從 1 起算，0 代表未發生
+CASES = {
+    # 第 2 月資金用盡：跑道為用盡前的 1 個月
+    'cash_out': (100, [-60, -60, 50, 50], dict(
+        breakeven_month=0, cash_out_month=2, min_cash_month=2, min_cash_balance=-20, runway_months=1, final_cumulative_surplus=-20,
+    )),
+    # 期間內未用盡但仍在燒錢：4 + 600 / 100 = 10 個月
+    'extrapolated': (1000, [-100, -100, -100, -100], dict(
+        breakeven_month=0, cash_out_month=0, min_cash_month=4, min_cash_balance=600, runway_months=10, final_cumulative_surplus=-400,
+    )),
+    # 最後一期現金流已轉正：跑道無限
+    'infinite': (500, [-100, -50, 200, 300], dict(
+        breakeven_month=3, cash_out_month=0, min_cash_month=2, min_cash_balance=350, runway_months=np.inf, final_cumulative_surplus=350,
+    )),
+    # 初始資金不足第一個月的支出：第 1 月即用盡，跑道 0
+    'short_capital': (50, [-100, 20, 20, 200], dict(
+        breakeven_month=4, cash_out_month=1, min_cash_month=1, min_cash_balance=-50, runway_months=0, final_cumulative_surplus=140,
+    )),
+}
+
+def _results(rows):
+    capital = np.array([[capital] for capital, _ in rows], dtype=float)
+    cash_flow = np.array([flows for _, flows in rows], dtype=float)
+    cumulative_surplus = np.cumsum(cash_flow, axis=1)
+    return {'cash_flow': cash_flow, 'cumulative_surplus': cumulative_surplus, 'cash_balance': capital + cumulative_surplus}
+
+@pytest.mark.parametrize('case', sorted(CASES))
+def test_metrics_by_hand(case):
+    capital, flows, expected = CASES[case]
+    metrics = batch_metrics(_results([(capital, flows)]))
+    for name, value in expected.items():
+        assert metrics[name][0] == value, name
+
+def test_metrics_in_one_batch():
+    # 整批計算的結果與逐列相同
+    rows = [CASES[case][:2] for case in sorted(CASES)]
+    metrics = batch_metrics(_results(rows))
+    for i, case in enumerate(sorted(CASES)):
+        for name, value in CASES[case][2].items():
+            assert metrics[name][i] == value, (case, name)
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model
+
+PARAMS = dict(
+    initial_growth_rate=0.34, final_growth_rate=0.03, monthly_subscription_price=320, annual_subscription_price=3200,
+    subscription_rate=0.02, rpm=65, personnel_cost_low=140000, personnel_cost_high=280000, operational_cost=53968,
+    initial_capital=6200000,
+)
+
+def test_second_simulation_hits_every_stage():
+    # 同一次執行中圖表與表格各模擬一次同一情境：第二次不得重算任何階段
+    model.clear_caches()
+    first = model.simulate_scenario("charts", 36, **PARAMS)
+    before = model.cache_stats()
+    second = model.simulate_scenario("table", 36, **PARAMS)
+    after = model.cache_stats()
+    for stage in model.STAGES:
+        assert after[stage]['misses'] == before[stage]['misses'], stage
+        assert after[stage]['hits'] > before[stage]['hits'], stage
+    assert first.breakeven_month == second.breakeven_month
+    assert np.shares_memory(first.cash_balance, second.cash_balance)
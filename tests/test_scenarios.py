@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scenarios import ScenarioError, load_scenarios
+
+OPTIMISTIC = """
+[scenarios.optimistic]
+name = "Optimistic"
+initial_growth_rate = 0.4
+final_growth_rate = 0.04
+monthly_subscription_price = 320
+annual_subscription_price = 3200
+subscription_rate = 0.03
+rpm = 80
+personnel_cost_low = 140000
+personnel_cost_high = 280000
+operational_cost = 53968
+initial_capital = 6200000
+"""
+
+def _write(tmp_path, text, name='scenarios.toml'):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+def test_conservative_inherits_scaled_baseline():
+    scenarios = load_scenarios(os.path.join(ROOT, 'scenarios.toml'))['scenarios']
+    baseline, conservative = scenarios['baseline']['params'], scenarios['conservative']['params']
+    assert conservative['rpm'] == baseline['rpm'] * 0.8
+    assert conservative['operational_cost'] == baseline['operational_cost']
+
+def test_scale_must_be_a_table(tmp_path):
+    path = _write(tmp_path, OPTIMISTIC + '\n[scenarios.low]\nextends = "optimistic"\nscale = 0.8\n')
+    with pytest.raises(ScenarioError, match="scale 需為表格"):
+        load_scenarios(path)
+
+def test_cli_runs_with_file_without_baseline(tmp_path):
+    # 情境檔不含 baseline / conservative 時，model 仍可匯入，summary 列出檔案中的情境
+    path = _write(tmp_path, OPTIMISTIC)
+    result = subprocess.run(
+        [sys.executable, 'cli.py', '--scenarios', path, 'summary'],
+        cwd=ROOT, capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    assert "Optimistic Scenario" in result.stdout
@@ -0,0 +1,50 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import service
+from engine import PARAM_NAMES
+from model import scenario_params
+
+BASE = scenario_params()
+
+def _values(i):
+    values = [BASE[name] for name in PARAM_NAMES]
+    values[PARAM_NAMES.index('subscription_rate')] += i * 1e-4
+    return tuple(values)
+
+def test_cache_is_bounded_by_bytes():
+    async def run():
+        batcher = service.ScenarioBatcher(cache_bytes=50000)
+        bodies = [await batcher.query(_values(i), 120, True) for i in range(20)]
+        return batcher, bodies
+
+    batcher, bodies = asyncio.run(run())
+    assert batcher.cached_bytes == sum(len(body) for body in batcher.cache.values())
+    assert batcher.cached_bytes <= 50000
+    # 最近的回應保留、最舊的被淘汰
+    assert service.param_hash(_values(19), 120, True) in batcher.cache
+    assert service.param_hash(_values(0), 120, True) not in batcher.cache
+    assert len(batcher.cache) < len(bodies)
+
+def test_rejects_non_integer_months_total():
+    for months_total in (36.9, 36.0, "36", True):
+        with pytest.raises(service.RequestError):
+            service.parse_query({'months_total': months_total}, BASE)
+    assert service.parse_query({'months_total': 48}, BASE)[1] == 48
+
+def test_series_must_be_json_boolean():
+    for series in ("false", 0, None):
+        with pytest.raises(service.RequestError):
+            service.parse_query({'series': series}, BASE)
+    assert service.parse_query({'series': False}, BASE)[2] is False
+    assert service.parse_query({}, BASE)[2] is True
+
+def test_rejects_boolean_parameters():
+    for payload in ({'rpm': True}, {'subscription_rate': False}):
+        with pytest.raises(service.RequestError):
+            service.parse_query(payload, BASE)
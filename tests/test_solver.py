@@ -0,0 +1,52 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import solver
+from model import MONTHS_TOTAL, scenario_params
+
+BASELINE_PARAMS = scenario_params('baseline')
+
+def test_infeasible_cost_target_is_nan():
+    # 第 5 月前不可能損益平衡：成本降到 0 也不夠，不得回傳負成本
+    result = solver.max_operational_cost_for_breakeven(5, BASELINE_PARAMS, MONTHS_TOTAL)
+    assert np.isnan(result['value'][0])
+    assert not result['feasible'][0]
+
+def test_subscription_rate_stays_within_domain(monkeypatch):
+    # 初期成長率 1% 時，訂閱率即使為 100% 也無法在第 3 月前損益平衡
+    seen = []
+    simulate_batch = solver.simulate_batch
+
+    def recording(params, horizon):
+        seen.append(params[:, solver.PARAM_NAMES.index('subscription_rate')].copy())
+        return simulate_batch(params, horizon)
+
+    monkeypatch.setattr(solver, 'simulate_batch', recording)
+    result = solver.min_subscription_rate_for_breakeven(3, BASELINE_PARAMS, MONTHS_TOTAL, initial_growth_rate=[0.01, 0.34])
+    assert np.isnan(result['value'][0])
+    assert result['feasible'].tolist() == [False, True]
+    assert 0 <= result['value'][1] <= 1
+    tried = np.concatenate(seen)
+    assert tried.min() >= 0 and tried.max() <= 1
+
+def test_max_cost_expands_past_a_satisfied_start():
+    # 起點端（成本上限 200000）已可在第 30 月前損益平衡，不得直接回傳起點
+    result = solver.max_operational_cost_for_breakeven(30, BASELINE_PARAMS, MONTHS_TOTAL)
+    value = result['value'][0]
+    assert result['feasible'][0]
+    assert value > 200000
+    columns = solver.grid_params(BASELINE_PARAMS, operational_cost=[value * 0.999, value * 1.001])
+    breakeven = solver.simulate_batch(solver.pack_params(**columns), MONTHS_TOTAL)['breakeven_month']
+    assert 0 < breakeven[0] <= 30
+    assert breakeven[1] > 30 or breakeven[1] == 0
+
+def test_min_value_expands_toward_domain_minimum():
+    # increasing=True 且 lower 高於有效範圍下限、已達成時，需往下找出真正的最低值
+    expected = solver.min_rpm_for_breakeven(18, BASELINE_PARAMS, MONTHS_TOTAL)['value'][0]
+    result = solver.solve_threshold('rpm', solver.breakeven_by(18), solver.grid_params(BASELINE_PARAMS), MONTHS_TOTAL, 9000, 10000)
+    assert result['value'][0] < 9000
+    assert np.isclose(result['value'][0], expected, rtol=1e-5)
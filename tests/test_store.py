@@ -0,0 +1,61 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import pack_params, simulate_batch
+from model import MONTHS_TOTAL, scenario_params
+from store import ResultStore, store_from_results
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    rng = np.random.default_rng(7)
+    n = 5000
+    columns = dict(scenario_params())
+    columns.update(
+        subscription_rate=rng.uniform(0.005, 0.04, n),
+        rpm=rng.uniform(30, 100, n),
+        initial_growth_rate=rng.uniform(0.15, 0.45, n),
+    )
+    params = pack_params(**columns)
+    path = str(tmp_path_factory.mktemp('store'))
+    store_from_results(path, params, simulate_batch(params, MONTHS_TOTAL), series=('cash_balance',))
+    # 重新開啟，確認讀取的是記憶體映射的檔案
+    return ResultStore(path)
+
+def _brute_force(store, conditions):
+    keep = np.ones(len(store), dtype=bool)
+    for name, operator, value in conditions:
+        column = np.asarray(store[name], dtype=float)
+        if name in ('breakeven_month', 'cash_out_month'):
+            column = np.where(column == 0, np.inf, column)
+        keep &= {'<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal, '==': np.equal}[operator](column, value)
+    return np.flatnonzero(keep)
+
+@pytest.mark.parametrize('conditions', [
+    [('breakeven_month', '<', 20)],
+    [('breakeven_month', '>=', 15), ('breakeven_month', '<=', 25)],
+    [('breakeven_month', '==', 22)],
+    [('breakeven_month', '>', 36)],  # 未達損益平衡（0 視為 +inf）
+    [('breakeven_month', '<', 20), ('subscription_rate', '<', 0.015)],
+    [('final_cumulative_surplus', '>', 0), ('rpm', '>=', 60)],
+    [('subscription_rate', '<', 0.01)],  # 無索引：逐段掃描
+])
+def test_where_matches_brute_force(store, conditions):
+    assert isinstance(store['breakeven_month'], np.memmap)
+    np.testing.assert_array_equal(store.where(*conditions), _brute_force(store, conditions))
+
+@pytest.mark.parametrize('name', ['final_cumulative_surplus', 'min_cash_balance', 'rpm'])
+@pytest.mark.parametrize('largest', [True, False])
+def test_top_k_matches_brute_force(store, name, largest):
+    values = np.asarray(store[name])
+    expected = np.sort(values)[::-1][:25] if largest else np.sort(values)[:25]
+    rows = store.top(name, 25, largest=largest)
+    np.testing.assert_array_equal(values[rows], expected)
+
+def test_count_matches_brute_force(store):
+    for month in (10, 20, 30, 37):
+        assert store.count('breakeven_month', '<', month) == len(_brute_force(store, [('breakeven_month', '<', month)]))
@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import sweep
+from engine import pack_params, summarize_batch
+from model import MONTHS_TOTAL, scenario_params
+
+AXES = {'rpm': [40, 55, 70, 85, 90], 'subscription_rate': [0.01, 0.015, 0.02, 0.025, 0.03, 0.035, 0.04]}
+SHARD_SIZE = 4
+
+# 完成 KILL_AFTER 個分片並再認領一個後直接結束行程，模擬中途被終止
+KILLED_WORKER = """
+import os, sys
+sys.path.insert(0, {root!r})
+import sweep
+write_shard = sweep.write_shard
+written = []
+def write_then_die(sweep_dir, shard, output):
+    write_shard(sweep_dir, shard, output)
+    written.append(shard)
+    if len(written) == {kill_after}:
+        sweep.claim_shard(sweep_dir)
+        os._exit(1)
+sweep.write_shard = write_then_die
+sweep.worker_loop(sys.argv[1])
+"""
+KILL_AFTER = 3
+
+def _create(tmp_path):
+    return sweep.create_sweep(str(tmp_path), AXES, scenario_params(), MONTHS_TOTAL, shard_size=SHARD_SIZE)
+
+def test_killed_sweep_resumes_and_finishes_each_point_once(tmp_path):
+    spec = _create(tmp_path)
+    code = KILLED_WORKER.format(root=ROOT, kill_after=KILL_AFTER)
+    result = subprocess.run([sys.executable, '-c', code, str(tmp_path)], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 1, result.stderr
+    status = sweep.sweep_status(str(tmp_path))
+    assert status['done'] == KILL_AFTER
+    assert status['claimed'] == 1  # 已結束行程留下的認領
+
+    # 重新執行：失效認領放回 todo，其餘分片各完成一次
+    completed = sweep.run_sweep(str(tmp_path), workers=1)
+    assert completed == spec['shards'] - KILL_AFTER
+    assert sweep.sweep_status(str(tmp_path)) == {'shards': spec['shards'], 'todo': 0, 'claimed': 0, 'done': spec['shards']}
+
+    covered = np.zeros(spec['points'], dtype=int)
+    expected = summarize_batch(pack_params(**sweep.grid_columns(spec, 0, spec['points'])), MONTHS_TOTAL)
+    for start, stop, metrics in sweep.iter_shards(str(tmp_path)):
+        covered[start:stop] += 1
+        np.testing.assert_array_equal(metrics['breakeven_month'], expected['breakeven_month'][start:stop])
+        np.testing.assert_allclose(metrics['final_cumulative_surplus'], expected['final_cumulative_surplus'][start:stop])
+    assert np.all(covered == 1)
+
+def test_fresh_claims_are_never_requeued(tmp_path):
+    _create(tmp_path)
+    todo = os.path.join(str(tmp_path), 'todo')
+    # 佇列檔建立已久：認領時 rename 保留舊的 mtime，不得因此被視為過期
+    old = time.time() - 7200
+    for name in os.listdir(todo):
+        os.utime(os.path.join(todo, name), (old, old))
+    shard = sweep.claim_shard(str(tmp_path))
+    assert shard is not None
+    assert sweep.requeue_stale(str(tmp_path), stale_after=60) == 0
+    assert sweep.sweep_status(str(tmp_path))['claimed'] == 1
+    # 同一主機上仍存活的擁有者也不會被放回
+    assert sweep.requeue_stale(str(tmp_path)) == 0